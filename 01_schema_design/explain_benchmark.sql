@@ -0,0 +1,42 @@
+-- Планы запросов админки до и после индексов из миграции movies 0003_fk_indexes.
+-- Запускать до и после миграции и сравнивать время и buffers:
+--     psql -d movies -f 01_schema_design/explain_benchmark.sql > explain_before.txt
+--     python manage.py migrate movies
+--     psql -d movies -f 01_schema_design/explain_benchmark.sql > explain_after.txt
+
+SET search_path TO content,public;
+ANALYZE film_work, genre, genre_film_work, person, person_film_work;
+
+-- Инлайн на странице жанра: фильмы жанра
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT gfw.id, gfw.film_work_id
+FROM genre_film_work gfw
+WHERE gfw.genre_id = (SELECT genre_id FROM genre_film_work GROUP BY genre_id ORDER BY count(*) DESC LIMIT 1);
+
+-- Инлайн на странице персоны: фильмы персоны
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT pfw.id, pfw.film_work_id, pfw.role
+FROM person_film_work pfw
+WHERE pfw.person_id = (SELECT person_id FROM person_film_work GROUP BY person_id ORDER BY count(*) DESC LIMIT 1);
+
+-- Список фильмов, отсортированный по дате создания
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id, title, type, creation_date, rating
+FROM film_work
+ORDER BY creation_date DESC, id DESC
+LIMIT 100;
+
+-- Список фильмов, отсортированный по рейтингу
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id, title, type, creation_date, rating
+FROM film_work
+ORDER BY rating DESC, id DESC
+LIMIT 100;
+
+-- Фильтр по типу
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id, title, type, creation_date, rating
+FROM film_work
+WHERE type = 'tv_show'
+ORDER BY title DESC
+LIMIT 100;
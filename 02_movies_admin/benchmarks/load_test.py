@@ -0,0 +1,77 @@
+"""Нагрузочный тест API фильмов: много одновременных клиентов, в том числе медленных.
+
+Сравнение WSGI и ASGI на одних и тех же данных (из каталога 02_movies_admin):
+
+    gunicorn config.wsgi -w 1 --threads 4 -b 127.0.0.1:8000
+    python benchmarks/load_test.py http://127.0.0.1:8000/api/v1/movies/ --clients 200 --slow 0.2
+
+    uvicorn config.asgi:application --workers 1 --port 8001
+    python benchmarks/load_test.py http://127.0.0.1:8001/api/v1/movies/ --clients 200 --slow 0.2
+
+--slow задаёт паузу между отправкой заголовков запроса и его окончанием: так ведут себя клиенты
+на плохой сети, и на WSGI-воркере они занимают поток на всё время запроса.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def fetch(host: str, port: int, target: str, slow: float) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}\r\n'.encode())
+        await writer.drain()
+        if slow:
+            await asyncio.sleep(slow)
+        writer.write(b'Connection: close\r\n\r\n')
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def client(url: str, deadline: float, slow: float, latencies: list, errors: list) -> None:
+    parts = urlsplit(url)
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            status = await fetch(parts.hostname, parts.port or 80, target, slow)
+        except (OSError, IndexError, ValueError) as error:
+            errors.append(repr(error))
+            continue
+        if status == 200:
+            latencies.append(time.monotonic() - started)
+        else:
+            errors.append(status)
+
+
+async def run(url: str, clients: int, duration: float, slow: float) -> None:
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(client(url, deadline, slow, latencies, errors) for _ in range(clients)))
+    elapsed = time.monotonic() - started
+
+    print(f'{url}: {clients} clients, {elapsed:.1f}s, slow {slow}s')
+    print(f'  requests: {len(latencies)} ok, {len(errors)} failed, {len(latencies) / elapsed:.1f} req/s')
+    if len(latencies) >= 2:
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f'  latency: p50 {quantiles[49] * 1000:.1f} ms, p95 {quantiles[94] * 1000:.1f} ms, '
+              f'p99 {quantiles[98] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('url')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--slow', type=float, default=0.0, help='Пауза в середине запроса, секунды')
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.clients, args.duration, args.slow))
@@ -0,0 +1,16 @@
+import os
+
+
+# По умолчанию кеш в памяти процесса. Для общего кеша между воркерами можно указать
+# любой совместимый бэкенд, например CACHE_BACKEND=django_redis.cache.RedisCache
+# и CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'movies'),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 60 * 60)),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', ''),
+    }
+}
+
+MOVIES_CACHE_ALIAS = os.environ.get('MOVIES_CACHE_ALIAS', 'default')
@@ -1,16 +1,53 @@
 import os
 
 
-DATABASES = {
-    'default': {
+def env_flag(name: str, default: str = '') -> bool:
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+# Запрос страницы или API дольше таймаута postgres отменяет сам, 0 - без ограничения.
+# Задаётся только соединениям, которые обслуживают веб-запросы (movies.db.set_statement_timeout):
+# у migrate и management-команд таймаута нет
+DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+
+DB_PGBOUNCER = env_flag('DB_PGBOUNCER')
+
+# Проверять живые соединения перед запросом (см. movies.db.check_connections)
+DB_HEALTH_CHECKS = env_flag('DB_HEALTH_CHECKS', 'true')
+
+
+def database(host: str, port) -> dict:
+    config = {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
-        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
-        'PORT': os.environ.get('DB_PORT', 5432),
+        'HOST': host,
+        'PORT': port,
+        # Соединение живёт CONN_MAX_AGE секунд и переиспользуется между запросами, 0 - закрывать после запроса
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
         'OPTIONS': {
-           'options': '-c search_path=public'
-        }
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
+    if DB_PGBOUNCER:
+        # pgbouncer в режиме transaction отдаёт каждую транзакцию любому серверному соединению:
+        # серверные курсоры .iterator() между транзакциями не живут, а параметры из options
+        # он не пропускает, а SET одного клиента достался бы другим. search_path тогда задаётся на роль,
+        # statement_timeout - только на роль веб-приложения, отдельную от роли для migrate и команд:
+        # ALTER ROLE <user> SET search_path = public, content;
+        # ALTER ROLE <web user> SET statement_timeout = '30s';
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    else:
+        # public первой: системные таблицы django создаются там, таблицы фильмов находятся в content
+        config['OPTIONS']['options'] = '-c search_path=public,content'
+    return config
+
+
+DATABASES = {
+    'default': database(os.environ.get('DB_HOST', '127.0.0.1'), os.environ.get('DB_PORT', 5432)),
 }
+
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = database(os.environ['DB_REPLICA_HOST'], os.environ.get('DB_REPLICA_PORT', 5432))
+    DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
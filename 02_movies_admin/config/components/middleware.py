@@ -1,4 +1,8 @@
+import os
+
+
 MIDDLEWARE = [
+    'movies.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -7,3 +11,24 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+
+# Запросы страницы с числом SQL-запросов больше порога пишутся в лог movies.queries с уровнем warning
+QUERY_STATS_WARN_COUNT = int(os.environ.get('QUERY_STATS_WARN_COUNT', 50))
+
+QUERY_STATS_SLOWEST = int(os.environ.get('QUERY_STATS_SLOWEST', 3))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'movies.queries': {
+            'handlers': ['console'],
+            'level': os.environ.get('QUERY_STATS_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
@@ -0,0 +1,23 @@
+from django.db import connections
+
+
+class ReplicaRouter:
+    """Чтение фильмов, жанров и персон с реплики, запись и всё остальное - в основную базу"""
+
+    replica = 'replica'
+    app_labels = ('movies',)
+
+    def db_for_read(self, model, **hints):
+        # Внутри транзакции (сохранение в админке) читаем то, что только что записали
+        if model._meta.app_label in self.app_labels and not connections['default'].in_atomic_block:
+            return self.replica
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -8,6 +8,7 @@ load_dotenv()
 
 include(
     'components/database.py',
+    'components/cache.py',
     'components/installed_apps.py',
     'components/middleware.py',
     'components/tamplates.py',
@@ -1,19 +1,80 @@
-from django.contrib import admin
+import uuid
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .forms import FilmworkActionForm, PaginatedInlineFormSet, PrefetchedRawIdWidget
 from .models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from .paginators import EstimatedCountPaginator
+from .signals import delete_links, films_changed_on_commit
+from .utils import iter_pk_chunks
+
+
+class RankedChangeList(ChangeList):
+    """При поиске без явной сортировки упорядочивает результаты по релевантности search_rank"""
+
+    def get_ordering(self, request, queryset):
+        if self.query and ORDER_VAR not in self.params and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', '-pk']
+        return super().get_ordering(request, queryset)
+
+
+class RankedSearchMixin:
 
+    def get_changelist(self, request, **kwargs):
+        return RankedChangeList
+
+
+class PaginatedInlineMixin:
+    """Инлайн по страницам из per_page строк с выбором связанных объектов через raw_id_fields:
+    размер страницы изменения не зависит ни от числа связей, ни от размера каталога.
+
+    Автокомплит и обычный raw_id виджет запрашивают выбранный объект для каждой строки,
+    поэтому подписи берутся из list_select_related через PrefetchedRawIdWidget"""
+
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/tabular_paginated.html'
+    per_page = 20
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(*self.list_select_related)
 
-class PersonRoleInline(admin.TabularInline):
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.raw_id_fields and db_field.name in self.list_select_related:
+            kwargs['widget'] = PrefetchedRawIdWidget(db_field.remote_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_param = f'{formset.get_default_prefix()}-page'
+        formset.page_number = request.GET.get(formset.page_param, 1)
+        formset.query_params = request.GET
+        return formset
+
+
+class PersonRoleInline(PaginatedInlineMixin, admin.TabularInline):
     model = PersonFilmwork
     extra = 0
+    raw_id_fields = ('film_work', 'person')
+    list_select_related = ('film_work', 'person')
 
 
-class FilmWorkGanreInline(admin.TabularInline):
+class FilmWorkGanreInline(PaginatedInlineMixin, admin.TabularInline):
     model = GenreFilmwork
     extra = 0
+    raw_id_fields = ('film_work', 'genre')
+    list_select_related = ('film_work', 'genre')
 
 
 @admin.register(Filmwork)
-class FilmworkAdmin(admin.ModelAdmin):
+class FilmworkAdmin(RankedSearchMixin, admin.ModelAdmin):
     
     
     
@@ -25,25 +86,131 @@ class FilmworkAdmin(admin.ModelAdmin):
         "rating",
     )
     
-    list_prefetch_related = ('genres',)
-    
+    paginator = EstimatedCountPaginator
+
+    show_full_result_count = False
+
     def get_queryset(self, request):
+        # Коррелированный подзапрос считается только для строк страницы,
+        # а в COUNT(*) пагинатора postgres выбрасывает его как неиспользуемый
+        genre_names = (
+            GenreFilmwork.objects
+            .filter(film_work=OuterRef('pk'))
+            .values('film_work')
+            .annotate(names=StringAgg('genre__name', delimiter=',  ', ordering='genre__name'))
+            .values('names')
+        )
         queryset = (
             super()
             .get_queryset(request)
-            .prefetch_related(*self.list_prefetch_related)
+            .annotate(genre_names=Subquery(genre_names))
         )
         return queryset
-    
+
     def get_genres(self, obj):
-        return ',  '.join([genre.name for genre in obj.genres.all()])
-    
-    search_fields = ('title', 'description', 'id',)
+        return obj.genre_names or ''
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу search_vector (русская и английская морфология)
+        и по триграммному индексу title для частей слов, ранжируя результаты.
+        Если ищут по uuid, отдаёт точное совпадение по первичному ключу"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        try:
+            film_work_id = uuid.UUID(search_term)
+        except ValueError:
+            pass
+        else:
+            return queryset.filter(id=film_work_id), False
+
+        query = (SearchQuery(search_term, config='russian', search_type='websearch')
+                 | SearchQuery(search_term, config='english', search_type='websearch'))
+        queryset = (
+            queryset
+            .filter(Q(search_vector=query) | Q(title__ilike_contains=search_term))
+            .annotate(search_rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('title', search_term))
+        )
+        return queryset, False
+
+    search_fields = ('title', 'description',)
     
     list_filter = ('type',)
+
+    action_form = FilmworkActionForm
+
+    actions = ('set_type', 'set_rating', 'add_genre', 'remove_genre')
+
+    # Массовые действия идут по action_chunk_size фильмов в отдельной транзакции:
+    # блокировки строк не держатся на всё выделение сразу
+    action_chunk_size = 1000
     
     get_genres.short_description = 'Жанры фильма'
 
+    def get_action_value(self, request, field):
+        """Проверенное значение поля action_form или None с сообщением об ошибке"""
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data[field] in (None, ''):
+            self.message_user(
+                request, f'Укажите поле «{form.fields[field].label}» для этого действия', messages.ERROR
+            )
+            return None
+        return form.cleaned_data[field]
+
+    def update_in_chunks(self, queryset, **values) -> int:
+        # QuerySet.update не вызывает save(): auto_now у updated_at не срабатывает, сигналы не приходят
+        updated = 0
+        values['updated_at'] = timezone.now()
+        for pks in iter_pk_chunks(queryset, self.action_chunk_size):
+            with transaction.atomic():
+                updated += Filmwork.objects.filter(pk__in=pks).update(**values)
+                films_changed_on_commit(pks)
+        return updated
+
+    @admin.action(description='Изменить тип выбранных фильмов')
+    def set_type(self, request, queryset):
+        film_work_type = self.get_action_value(request, 'type')
+        if film_work_type is not None:
+            updated = self.update_in_chunks(queryset, type=film_work_type)
+            self.message_user(request, f'Тип изменён у {updated} фильмов', messages.SUCCESS)
+
+    @admin.action(description='Изменить рейтинг выбранных фильмов')
+    def set_rating(self, request, queryset):
+        rating = self.get_action_value(request, 'rating')
+        if rating is not None:
+            updated = self.update_in_chunks(queryset, rating=rating)
+            self.message_user(request, f'Рейтинг изменён у {updated} фильмов', messages.SUCCESS)
+
+    @admin.action(description='Добавить жанр выбранным фильмам')
+    def add_genre(self, request, queryset):
+        genre = self.get_action_value(request, 'genre')
+        if genre is None:
+            return
+        for pks in iter_pk_chunks(queryset, self.action_chunk_size):
+            with transaction.atomic():
+                # Уже существующие связи пропускает уникальный индекс film_work_genre_cnst
+                GenreFilmwork.objects.bulk_create(
+                    [GenreFilmwork(film_work_id=pk, genre=genre) for pk in pks], ignore_conflicts=True
+                )
+                films_changed_on_commit(pks)
+        self.message_user(request, f'Жанр «{genre}» добавлен выбранным фильмам', messages.SUCCESS)
+
+    @admin.action(description='Убрать жанр у выбранных фильмов')
+    def remove_genre(self, request, queryset):
+        genre = self.get_action_value(request, 'genre')
+        if genre is None:
+            return
+        removed = 0
+        for pks in iter_pk_chunks(queryset, self.action_chunk_size):
+            with transaction.atomic():
+                deleted = delete_links(GenreFilmwork.objects.filter(film_work_id__in=pks, genre=genre))
+                if deleted:
+                    films_changed_on_commit(pks)
+                removed += deleted
+        self.message_user(request, f'Жанр «{genre}» убран у {removed} фильмов', messages.SUCCESS)
+
     
 
     fields = (
@@ -57,19 +224,46 @@ class FilmworkAdmin(admin.ModelAdmin):
     )
 
 
+class TrigramSearchMixin(RankedSearchMixin):
+    """Поиск подстроки через ILIKE (movies.lookups) по полю trigram_search_field, которое покрыто
+    триграммным GIN-индексом, с ранжированием по похожести"""
+
+    trigram_search_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        queryset = (
+            queryset
+            .filter(**{f'{self.trigram_search_field}__ilike_contains': search_term})
+            .annotate(search_rank=TrigramSimilarity(self.trigram_search_field, search_term))
+        )
+        return queryset, False
+
+
 @admin.register(Genre)
-class GenreAdmin(admin.ModelAdmin):
+class GenreAdmin(TrigramSearchMixin, admin.ModelAdmin):
     list_display = ("name", "description")
 
+    search_fields = ("name",)
+
+    trigram_search_field = "name"
+
     fields = ("name", "description")
 
     inlines = [FilmWorkGanreInline]
 
 
 @admin.register(Person)
-class PersonAdmin(admin.ModelAdmin):
+class PersonAdmin(TrigramSearchMixin, admin.ModelAdmin):
     list_display = ("full_name", "birth_date")
 
+    search_fields = ("full_name",)
+
+    trigram_search_field = "full_name"
+
     fields = ("full_name", "birth_date")
 
     inlines = [PersonRoleInline]
@@ -0,0 +1,6 @@
+from django.urls import include, path
+
+
+urlpatterns = [
+    path('v1/', include('movies.api.v1.urls')),
+]
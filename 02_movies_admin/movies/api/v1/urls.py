@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+
+urlpatterns = [
+    path('movies/', views.movies_list_api),
+    path('movies/<uuid:pk>/', views.movies_detail_api),
+    path('genres/', views.genres_list_api),
+    path('cache/stats/', views.CacheStatsApi.as_view()),
+]
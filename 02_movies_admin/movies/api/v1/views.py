@@ -0,0 +1,116 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from movies import cache
+from movies.models import FilmworkFull, Genre, PersonRole
+
+
+FILM_FIELDS = ('id', 'title', 'description', 'creation_date', 'rating', 'type')
+FULL_FIELDS = FILM_FIELDS + ('genres',) + tuple(f'{role}s' for role in PersonRole.values)
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def serialize_film(film: dict) -> dict:
+    return {
+        **{field: film[field] for field in FILM_FIELDS},
+        'genres': film['genres'],
+        'persons': {role: film[f'{role}s'] for role in PersonRole.values},
+    }
+
+
+def films_with_relations(film_work_ids) -> list[dict]:
+    """Фильмы с жанрами и персонами, сгруппированными по роли, из content.film_work_full"""
+    films = FilmworkFull.objects.filter(id__in=film_work_ids).order_by('id').values(*FULL_FIELDS)
+    return [serialize_film(film) for film in films]
+
+
+def movies_page(cursor, page_size: int) -> dict:
+    """Страница списка фильмов с keyset-пагинацией по id.
+
+    Запрос страницы не зависит от её номера: строки content.film_work_full
+    читаются по индексу первичного ключа начиная с курсора"""
+    films = FilmworkFull.objects.order_by('id')
+    if cursor is not None:
+        films = films.filter(id__gt=cursor)
+    films = list(films.values(*FULL_FIELDS)[:page_size + 1])
+
+    has_next = len(films) > page_size
+    films = films[:page_size]
+
+    return {
+        'results': [serialize_film(film) for film in films],
+        'next_cursor': films[-1]['id'] if has_next else None,
+    }
+
+
+def movie_detail(film_work_id):
+    """Один фильм из кеша или базы; None, если фильма нет"""
+    film = cache.get_film(film_work_id)
+    if film is None:
+        films = films_with_relations([film_work_id])
+        if not films:
+            return None
+        film = films[0]
+        cache.set_film(film_work_id, film)
+    return film
+
+
+def genre_list() -> list[dict]:
+    """Все жанры; список целиком лежит в кеше и сбрасывается при изменении жанров"""
+    genres = cache.get_genre_list()
+    if genres is None:
+        genres = list(Genre.objects.order_by('name').values('id', 'name', 'description'))
+        cache.set_genre_list(genres)
+    return genres
+
+
+# Представления API асинхронные: под ASGI один процесс обслуживает много медленных клиентов,
+# а работа с ORM и кешем, синхронная в Django 3.2, уходит в поток через sync_to_async.
+# Декораторы вроде require_GET в этой версии не поддерживают корутины, поэтому метод проверяется явно.
+
+async def movies_list_api(request):
+    """Список фильмов: ?cursor=<id последнего фильма>&page_size=N"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        page_size = int(request.GET.get('page_size', PAGE_SIZE))
+        cursor = request.GET.get('cursor')
+        cursor = uuid.UUID(cursor) if cursor else None
+    except ValueError:
+        return HttpResponseBadRequest('Invalid page_size or cursor')
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        return HttpResponseBadRequest(f'page_size must be between 1 and {MAX_PAGE_SIZE}')
+
+    return JsonResponse(await sync_to_async(movies_page)(cursor, page_size))
+
+
+async def movies_detail_api(request, pk):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    film = await sync_to_async(movie_detail)(pk)
+    if film is None:
+        raise Http404
+    return JsonResponse(film)
+
+
+async def genres_list_api(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    return JsonResponse({'results': await sync_to_async(genre_list)()})
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class CacheStatsApi(View):
+    """Счётчики попаданий и промахов кеша, доступны только сотрудникам"""
+
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(cache.stats())
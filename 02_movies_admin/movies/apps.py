@@ -1,4 +1,7 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 from django.utils.translation import gettext_lazy as _
 
 
@@ -6,3 +9,16 @@ class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movies'
     verbose_name = _('movies')
+
+    def ready(self):
+        from . import lookups, signals  # noqa: F401
+
+        if getattr(settings, 'DB_HEALTH_CHECKS', False):
+            from .db import check_connections
+            request_started.connect(check_connections, dispatch_uid='movies_check_connections')
+
+        # За pgbouncer SET одного клиента достался бы другим, там таймаут задаётся на роль
+        if getattr(settings, 'DB_STATEMENT_TIMEOUT', 0) and not getattr(settings, 'DB_PGBOUNCER', False):
+            from .db import start_statement_timeout, statement_timeout_on_connect
+            request_started.connect(start_statement_timeout, dispatch_uid='movies_statement_timeout')
+            connection_created.connect(statement_timeout_on_connect, dispatch_uid='movies_statement_timeout')
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import caches
+
+
+FILM_KEY = 'movies:film:{}'
+GENRE_LIST_KEY = 'movies:genres'
+STATS_KEY = 'movies:stats:{}:{}'
+STATS_KINDS = ('film', 'genres')
+
+
+def get_cache():
+    return caches[getattr(settings, 'MOVIES_CACHE_ALIAS', 'default')]
+
+
+def count(kind: str, hit: bool) -> None:
+    """Увеличивает счётчик попаданий или промахов; счётчики хранятся в самом кеше,
+    поэтому с общим бэкендом (redis) они общие для всех воркеров"""
+    key = STATS_KEY.format(kind, 'hits' if hit else 'misses')
+    cache = get_cache()
+    if not cache.add(key, 1, timeout=None):
+        cache.incr(key)
+
+
+def stats() -> dict:
+    keys = {(kind, outcome): STATS_KEY.format(kind, outcome) for kind in STATS_KINDS for outcome in ('hits', 'misses')}
+    values = get_cache().get_many(keys.values())
+    return {
+        kind: {outcome: values.get(keys[kind, outcome], 0) for outcome in ('hits', 'misses')}
+        for kind in STATS_KINDS
+    }
+
+
+def reset_stats() -> None:
+    get_cache().delete_many([STATS_KEY.format(kind, outcome) for kind in STATS_KINDS for outcome in ('hits', 'misses')])
+
+
+def film_key(film_work_id) -> str:
+    return FILM_KEY.format(film_work_id)
+
+
+def get_film(film_work_id):
+    film = get_cache().get(film_key(film_work_id))
+    count('film', film is not None)
+    return film
+
+
+def set_film(film_work_id, payload: dict) -> None:
+    get_cache().set(film_key(film_work_id), payload)
+
+
+def invalidate_film(film_work_id) -> None:
+    get_cache().delete(film_key(film_work_id))
+
+
+def invalidate_films(film_work_ids) -> None:
+    keys = [film_key(film_work_id) for film_work_id in film_work_ids]
+    if keys:
+        get_cache().delete_many(keys)
+
+
+def get_genre_list():
+    genres = get_cache().get(GENRE_LIST_KEY)
+    count('genres', genres is not None)
+    return genres
+
+
+def set_genre_list(payload: list) -> None:
+    get_cache().set(GENRE_LIST_KEY, payload)
+
+
+def invalidate_genre_list() -> None:
+    get_cache().delete(GENRE_LIST_KEY)
@@ -0,0 +1,118 @@
+"""Формат выгрузки каталога (export_catalogue) и загрузки фидов (import_catalogue).
+
+NDJSON - один фильм на строку: поля фильма, список genres и persons, сгруппированные по роли.
+CSV - те же поля плоско, списки жанров и персон склеены через LIST_SEPARATOR в колонках
+genres, actors, directors, screenwriters."""
+import csv
+import datetime
+import gzip
+import json
+import uuid
+from contextlib import nullcontext
+
+from .models import Filmwork, PersonRole
+
+
+FILM_FIELDS = ('id', 'title', 'description', 'creation_date', 'rating', 'type')
+ROLE_FIELDS = {role: f'{role}s' for role in PersonRole.values}
+CSV_FIELDS = FILM_FIELDS + ('genres',) + tuple(ROLE_FIELDS.values())
+FORMATS = ('ndjson', 'csv')
+
+LIST_SEPARATOR = '|'
+
+# Фильм без id в фиде получает id из названия, даты и типа: повторная загрузка того же фида обновит его
+FEED_NAMESPACE = uuid.UUID('5b0ba3e2-8c1f-4c35-9d8e-3d5b1c8f4a10')
+
+NAME_MAX_LENGTH = 200
+
+
+def detect_format(path: str, file_format) -> str:
+    if file_format:
+        return file_format
+    return 'csv' if path.removesuffix('.gz').endswith('.csv') else 'ndjson'
+
+
+def open_text(path: str, mode: str, stdio):
+    """Текстовый файл по пути или stdio для '-'; .gz сжимается и распаковывается на лету"""
+    if path == '-':
+        return nullcontext(stdio)
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def read_records(stream, file_format: str):
+    """(номер строки, сырая запись): словарь строки для CSV, текст строки для NDJSON"""
+    if file_format == 'csv':
+        yield from enumerate(csv.DictReader(stream), 2)
+        return
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def split_names(value) -> list:
+    return [name.strip() for name in (value or '').split(LIST_SEPARATOR) if name.strip()]
+
+
+def clean_names(names, field: str) -> list:
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError(f'{field}: expected a list of names')
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    for name in names:
+        if len(name) > NAME_MAX_LENGTH:
+            raise ValueError(f'{field}: name longer than {NAME_MAX_LENGTH} characters')
+    return names
+
+
+def parse_record(raw, file_format: str) -> dict:
+    """Проверенный фильм из записи фида, ValueError с причиной, если запись не подходит"""
+    if file_format == 'csv':
+        record = {field: raw.get(field) or None for field in FILM_FIELDS}
+        record['genres'] = split_names(raw.get('genres'))
+        record['persons'] = {role: split_names(raw.get(column)) for role, column in ROLE_FIELDS.items()}
+    else:
+        record = json.loads(raw)
+        if not isinstance(record, dict):
+            raise ValueError('expected a JSON object')
+
+    title = (record.get('title') or '').strip()
+    if not title or len(title) > NAME_MAX_LENGTH:
+        raise ValueError(f'title: required, at most {NAME_MAX_LENGTH} characters')
+
+    film_work_type = record.get('type')
+    if film_work_type not in Filmwork.FilmworkType.values:
+        raise ValueError(f'type: {film_work_type!r} is not one of {", ".join(Filmwork.FilmworkType.values)}')
+
+    creation_date = record.get('creation_date')
+    if creation_date:
+        creation_date = datetime.date.fromisoformat(str(creation_date))
+
+    rating = record.get('rating')
+    if rating not in (None, ''):
+        rating = float(rating)
+        if not 0 <= rating <= 10:
+            raise ValueError('rating: must be between 0 and 10')
+    else:
+        rating = None
+
+    persons = record.get('persons') or {}
+    if not isinstance(persons, dict) or set(persons) - set(PersonRole.values):
+        raise ValueError(f'persons: roles must be among {", ".join(PersonRole.values)}')
+
+    film_work_id = record.get('id')
+    film_work_id = (uuid.UUID(str(film_work_id)) if film_work_id
+                    else uuid.uuid5(FEED_NAMESPACE, f'{title}|{creation_date or ""}|{film_work_type}'))
+
+    return {
+        'id': film_work_id,
+        'title': title,
+        'description': record.get('description') or None,
+        'creation_date': creation_date or None,
+        'rating': rating,
+        'type': film_work_type,
+        'genres': clean_names(record.get('genres') or [], 'genres'),
+        'persons': [
+            (name, role) for role, names in persons.items() for name in clean_names(names or [], f'persons.{role}')
+        ],
+    }
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import connections
+
+
+def check_connections(**kwargs) -> None:
+    """Закрывает постоянные соединения, которые не отвечают на ping.
+
+    Соединение с CONN_MAX_AGE переживает перезапуск postgres или pgbouncer, и без проверки первый
+    запрос после этого падает с OperationalError. Закрытое соединение django откроет заново.
+    """
+    for connection in connections.all():
+        if connection.connection is not None and not connection.in_atomic_block and not connection.is_usable():
+            connection.close()
+
+
+# Процесс считается веб-процессом с первого request_started. manage.py migrate и другие команды
+# этот сигнал не отправляют, поэтому их соединения остаются без statement_timeout
+serving_requests = False
+
+
+def set_statement_timeout(connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute('SET statement_timeout = %s', [settings.DB_STATEMENT_TIMEOUT])
+
+
+def start_statement_timeout(**kwargs) -> None:
+    """request_started: соединения, открытые до первого запроса, получают таймаут сразу"""
+    global serving_requests
+    if serving_requests:
+        return
+    serving_requests = True
+    for connection in connections.all():
+        if connection.connection is not None:
+            set_statement_timeout(connection)
+
+
+def statement_timeout_on_connect(sender, connection, **kwargs) -> None:
+    """connection_created: новые соединения веб-процесса получают таймаут при открытии"""
+    if serving_requests:
+        set_statement_timeout(connection)
@@ -0,0 +1,81 @@
+from django import forms
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.urls import NoReverseMatch, reverse
+from django.utils.text import Truncator
+
+from .models import Filmwork, Genre
+
+
+class PrefetchedRawIdWidget(ForeignKeyRawIdWidget):
+    """raw_id виджет, который подписывает значение уже загруженным объектом, а не запросом на каждую строку.
+
+    Объект подставляет PaginatedInlineFormSet из select_related инлайна; для других значений,
+    например после ошибки в форме, виджет запрашивает объект как обычно"""
+
+    prefetched = None
+
+    def label_and_url_for_value(self, value):
+        obj = self.prefetched
+        if obj is None or str(obj.pk) != str(value):
+            return super().label_and_url_for_value(value)
+        try:
+            url = reverse(f'{self.admin_site.name}:{obj._meta.app_label}_{obj._meta.model_name}_change', args=(obj.pk,))
+        except NoReverseMatch:
+            url = ''
+        return Truncator(obj).words(14), url
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Инлайн-формсет, который показывает только одну страницу связанных объектов.
+
+    Номер страницы берётся из GET-параметра page_param; форма изменения отправляется
+    на тот же адрес, поэтому при сохранении обрабатывается та же страница."""
+
+    per_page = 20
+    page_number = 1
+    page_param = 'page'
+    query_params = None
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            queryset = super().get_queryset()
+            self.page = Paginator(queryset, self.per_page).get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def get_page_query_string(self, number) -> str:
+        """Строка запроса другой страницы, как ChangeList.get_query_string: остальные параметры
+        (_changelist_filters, страница соседнего инлайна) сохраняются, заменяется только page_param"""
+        params = self.query_params.copy() if self.query_params is not None else QueryDict(mutable=True)
+        params[self.page_param] = number
+        return f'?{params.urlencode()}'
+
+    @property
+    def previous_page_query_string(self) -> str:
+        return self.get_page_query_string(self.page.previous_page_number())
+
+    @property
+    def next_page_query_string(self) -> str:
+        return self.get_page_query_string(self.page.next_page_number())
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if form.instance.pk is None:
+            return
+        for name, field in form.fields.items():
+            if isinstance(field.widget, PrefetchedRawIdWidget) and form.instance._meta.get_field(name).is_cached(
+                form.instance
+            ):
+                field.widget.prefetched = getattr(form.instance, name)
+
+
+class FilmworkActionForm(ActionForm):
+    """Параметры массовых действий над фильмами, выводятся рядом со списком действий"""
+
+    type = forms.ChoiceField(label='Тип', choices=[('', '---------')] + Filmwork.FilmworkType.choices, required=False)
+    rating = forms.FloatField(label='Рейтинг', min_value=0, max_value=10, required=False)
+    genre = forms.ModelChoiceField(label='Жанр', queryset=Genre.objects.order_by('name'), required=False)
@@ -0,0 +1,18 @@
+from django.db import models
+from django.db.models import Lookup
+
+
+@models.CharField.register_lookup
+class ILikeContains(Lookup):
+    """Подстрока без учёта регистра как `col ILIKE '%term%'`.
+
+    icontains в postgres компилируется в UPPER(col::text) LIKE UPPER(...), и триграммный
+    GIN-индекс по самой колонке такое выражение не обслуживает, а ILIKE обслуживает"""
+
+    lookup_name = 'ilike_contains'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        rhs_params = [f'%{connection.ops.prep_for_like_query(param)}%' for param in rhs_params]
+        return f'{lhs} ILIKE {rhs}', lhs_params + rhs_params
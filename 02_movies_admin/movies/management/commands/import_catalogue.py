@@ -0,0 +1,176 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from movies.catalogue import FILM_FIELDS, FORMATS, detect_format, open_text, parse_record, read_records
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from movies.signals import delete_links, films_changed_on_commit
+
+
+FILM_UPDATE_FIELDS = ('title', 'description', 'creation_date', 'rating', 'type', 'updated_at')
+
+
+class NameCache:
+    """Имя -> id жанров или персон; недостающие создаются одним bulk_create на пачку.
+
+    Если транзакция пачки откатилась, созданные в ней записи нужно забыть через forget()"""
+
+    def __init__(self, model, name_field: str):
+        self.model = model
+        self.name_field = name_field
+        self.ids = {}
+        self.created = []
+
+    def resolve(self, names) -> dict:
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            existing = (
+                self.model.objects
+                .filter(**{f'{self.name_field}__in': missing})
+                .order_by(self.name_field, 'created_at')
+                .values_list(self.name_field, 'id')
+            )
+            for name, object_id in existing:
+                self.ids.setdefault(name, object_id)
+            new_objects = [self.model(**{self.name_field: name}) for name in missing - self.ids.keys()]
+            self.model.objects.bulk_create(new_objects)
+            for new_object in new_objects:
+                name = getattr(new_object, self.name_field)
+                self.ids[name] = new_object.id
+                self.created.append(name)
+        return self.ids
+
+    def commit(self) -> None:
+        self.created = []
+
+    def forget(self) -> None:
+        for name in self.created:
+            self.ids.pop(name, None)
+        self.created = []
+
+
+class Command(BaseCommand):
+    help = 'Загружает фильмы с жанрами и персонами из CSV или NDJSON фида (формат export_catalogue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл фида, .gz распаковывается; '-' - stdin")
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help='По умолчанию по расширению файла, иначе ndjson')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Фильмов в одной транзакции')
+        parser.add_argument('--rejects', default='import_rejects.ndjson',
+                            help='Куда записать отклонённые строки с причиной')
+
+    def handle(self, *args, path, file_format, batch_size, rejects, **options):
+        file_format = detect_format(path, file_format)
+        self.genres = NameCache(Genre, 'name')
+        self.persons = NameCache(Person, 'full_name')
+        self.imported = 0
+        self.rejected = 0
+
+        started = time.monotonic()
+        with open_text(path, 'r', sys.stdin) as stream, open(rejects, 'w', encoding='utf-8') as self.rejects:
+            batch = {}
+            for line_number, raw in read_records(stream, file_format):
+                try:
+                    film = parse_record(raw, file_format)
+                except (ValueError, TypeError, AttributeError) as error:
+                    self.reject(line_number, raw, error)
+                    continue
+                # Повтор фильма в пачке заменяет предыдущую версию, как при последовательной загрузке
+                batch.pop(film['id'], None)
+                batch[film['id']] = (line_number, raw, film)
+                if len(batch) >= batch_size:
+                    self.save(list(batch.values()))
+                    batch = {}
+            if batch:
+                self.save(list(batch.values()))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Imported {self.imported} films in {elapsed:.1f}s'))
+        if self.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {self.rejected} rows, see {rejects}'))
+
+    def reject(self, line_number: int, raw, error) -> None:
+        self.rejected += 1
+        self.rejects.write(json.dumps({'line': line_number, 'error': str(error), 'row': raw}, ensure_ascii=False))
+        self.rejects.write('\n')
+
+    def save(self, batch: list) -> None:
+        """Пишет пачку в одной транзакции; если база её не приняла, пишет фильмы по одному,
+        чтобы отклонить только строки с ошибкой"""
+        try:
+            with transaction.atomic():
+                self.write_batch([film for _, _, film in batch])
+        except DatabaseError as error:
+            self.genres.forget()
+            self.persons.forget()
+            if len(batch) == 1:
+                line_number, raw, _ = batch[0]
+                self.reject(line_number, raw, error)
+                return
+            for item in batch:
+                self.save([item])
+            return
+        self.genres.commit()
+        self.persons.commit()
+        self.imported += len(batch)
+
+    def write_batch(self, films: list) -> None:
+        genre_ids = self.genres.resolve({name for film in films for name in film['genres']})
+        person_ids = self.persons.resolve({name for film in films for name, _ in film['persons']})
+        film_work_ids = [film['id'] for film in films]
+
+        # bulk_create(update_conflicts=True) появился только в Django 4.1: существующие фильмы
+        # обновляются bulk_update, новые создаются bulk_create. bulk_update не вызывает auto_now,
+        # поэтому updated_at проставляется явно
+        now = timezone.now()
+        existing = set(Filmwork.objects.filter(id__in=film_work_ids).values_list('id', flat=True))
+        objects = [
+            Filmwork(created_at=now, updated_at=now, **{field: film[field] for field in FILM_FIELDS}) for film in films
+        ]
+        Filmwork.objects.bulk_create([film for film in objects if film.id not in existing])
+        Filmwork.objects.bulk_update([film for film in objects if film.id in existing], FILM_UPDATE_FIELDS)
+
+        # Связи из фида заменяют прежние: лишние удаляются, недостающие создаются
+        wanted_genres = {(film['id'], genre_ids[name]) for film in films for name in film['genres']}
+        wanted_persons = {}
+        for film in films:
+            for name, role in film['persons']:
+                # У пары фильм-персона одна роль (film_work_person_cnst), берётся первая из фида
+                wanted_persons.setdefault((film['id'], person_ids[name]), role)
+
+        stale_genres = []
+        for link_id, film_work_id, genre_id in (
+            GenreFilmwork.objects.filter(film_work_id__in=film_work_ids).values_list('id', 'film_work_id', 'genre_id')
+        ):
+            if (film_work_id, genre_id) in wanted_genres:
+                wanted_genres.discard((film_work_id, genre_id))
+            else:
+                stale_genres.append(link_id)
+
+        stale_persons = []
+        for link_id, film_work_id, person_id, role in (
+            PersonFilmwork.objects.filter(film_work_id__in=film_work_ids)
+            .values_list('id', 'film_work_id', 'person_id', 'role')
+        ):
+            if wanted_persons.get((film_work_id, person_id)) == role:
+                del wanted_persons[film_work_id, person_id]
+            else:
+                stale_persons.append(link_id)
+
+        delete_links(GenreFilmwork.objects.filter(id__in=stale_genres))
+        delete_links(PersonFilmwork.objects.filter(id__in=stale_persons))
+        GenreFilmwork.objects.bulk_create(
+            GenreFilmwork(film_work_id=film_work_id, genre_id=genre_id) for film_work_id, genre_id in wanted_genres
+        )
+        PersonFilmwork.objects.bulk_create(
+            PersonFilmwork(film_work_id=film_work_id, person_id=person_id, role=role, created_at=now)
+            for (film_work_id, person_id), role in wanted_persons.items()
+        )
+
+        # bulk-операции и delete_links не отправляют сигналы: film_work_full и кеш обновляются явно, раз на пачку
+        films_changed_on_commit(film_work_ids)
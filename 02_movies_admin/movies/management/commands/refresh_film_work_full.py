@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.models import Filmwork, FilmworkFull
+from movies.utils import iter_pk_chunks
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает content.film_work_full по всем фильмам, пачками в отдельных транзакциях'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, chunk_size, **options):
+        refreshed = 0
+        for pks in iter_pk_chunks(Filmwork.objects.all(), chunk_size):
+            with transaction.atomic():
+                FilmworkFull.refresh(pks)
+            refreshed += len(pks)
+            self.stdout.write(f'\r{refreshed} films', ending='')
+        self.stdout.write(self.style.SUCCESS(f'\nRefreshed {refreshed} films'))
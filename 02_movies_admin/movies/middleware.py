@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('movies.queries')
+
+
+class QueryStats:
+    """execute_wrapper, который считает запросы, их суммарное время и запоминает самые медленные"""
+
+    def __init__(self, slowest: int = 3):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_limit = slowest
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.slowest.append((duration, sql))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.slowest_limit:]
+
+
+class QueryStatsMiddleware:
+    """Число SQL-запросов, их время и время view для каждого запроса.
+
+    Отдаёт их в заголовке Server-Timing (виден во вкладке Network браузера) и пишет в лог movies.queries:
+    warning, если запросов больше QUERY_STATS_WARN_COUNT, иначе debug.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.warn_count = getattr(settings, 'QUERY_STATS_WARN_COUNT', 50)
+        self.slowest = getattr(settings, 'QUERY_STATS_SLOWEST', 3)
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Так Django 3.2 узнаёт асинхронный middleware (как в MiddlewareMixin), иначе обернёт его в поток
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = QueryStats(self.slowest)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self.watch_queries(stack, stats)
+            response = self.get_response(request)
+        return self.report(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        """Асинхронная ветка для ASGI: запросы к базе идут в потоке sync_to_async(thread_sensitive=True),
+        поэтому обёртки ставятся и снимаются в нём же. Этот поток общий для всех запросов процесса,
+        так что при одновременных запросах в счётчик попадут и запросы соседей"""
+        stats = QueryStats(self.slowest)
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self.watch_queries)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, stats, time.perf_counter() - started)
+
+    @staticmethod
+    def watch_queries(stack: ExitStack, stats: QueryStats) -> None:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+    def report(self, request, response, stats: QueryStats, total: float):
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f'app;dur={(total - stats.duration) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+        level = logging.WARNING if stats.count > self.warn_count else logging.DEBUG
+        logger.log(
+            level,
+            '%s %s: %s queries, %.1f ms in db, %.1f ms total',
+            request.method, request.path, stats.count, stats.duration * 1000, total * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'query_count': stats.count,
+                'db_ms': round(stats.duration * 1000, 1),
+                'total_ms': round(total * 1000, 1),
+                'slowest_queries': [
+                    {'ms': round(duration * 1000, 1), 'sql': sql} for duration, sql in stats.slowest
+                ],
+            },
+        )
+        return response
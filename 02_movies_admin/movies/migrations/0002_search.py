@@ -0,0 +1,68 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION content.film_work_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER film_work_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON content.film_work
+    FOR EACH ROW EXECUTE PROCEDURE content.film_work_search_vector_update();
+
+UPDATE content.film_work SET title = title;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS film_work_search_vector_trigger ON content.film_work;
+DROP FUNCTION IF EXISTS content.film_work_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='filmwork',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='filmwork',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='film_work_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filmwork',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title'], name='film_work_title_trgm_idx', opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'], name='genre_name_trgm_idx', opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['full_name'], name='person_full_name_trgm_idx', opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, reverse_sql=DROP_SEARCH_VECTOR_TRIGGER),
+    ]
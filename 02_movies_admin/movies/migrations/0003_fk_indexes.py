@@ -0,0 +1,97 @@
+from django.db import migrations, models
+
+
+# Базы, созданные по db_schema.ddl до ревизии, хранят ссылки в таблицах связей как TEXT
+# без внешних ключей. Приводим колонки к uuid и добавляем недостающие внешние ключи;
+# на базах, созданных миграциями Django, блок ничего не меняет.
+LINK_COLUMNS_TO_UUID = """
+DO $$
+DECLARE
+    link record;
+BEGIN
+    FOR link IN
+        SELECT * FROM (VALUES
+            ('genre_film_work', 'film_work_id', 'film_work'),
+            ('genre_film_work', 'genre_id', 'genre'),
+            ('person_film_work', 'film_work_id', 'film_work'),
+            ('person_film_work', 'person_id', 'person')
+        ) AS links (table_name, column_name, parent_table)
+    LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = 'content' AND table_name = link.table_name
+                AND column_name = link.column_name AND data_type = 'text'
+        ) THEN
+            EXECUTE format('ALTER TABLE content.%I ALTER COLUMN %I TYPE uuid USING %I::uuid',
+                           link.table_name, link.column_name, link.column_name);
+        END IF;
+
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint constraints
+            JOIN pg_attribute columns
+                ON columns.attrelid = constraints.conrelid AND columns.attnum = ANY (constraints.conkey)
+            WHERE constraints.contype = 'f'
+                AND constraints.conrelid = format('content.%I', link.table_name)::regclass
+                AND columns.attname = link.column_name
+        ) THEN
+            EXECUTE format('ALTER TABLE content.%I ADD CONSTRAINT %I FOREIGN KEY (%I) '
+                           'REFERENCES content.%I (id) ON DELETE CASCADE NOT VALID',
+                           link.table_name, link.table_name || '_' || link.column_name || '_fk',
+                           link.column_name, link.parent_table);
+            EXECUTE format('ALTER TABLE content.%I VALIDATE CONSTRAINT %I',
+                           link.table_name, link.table_name || '_' || link.column_name || '_fk');
+        END IF;
+    END LOOP;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_search'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LINK_COLUMNS_TO_UUID, reverse_sql=migrations.RunSQL.noop),
+        # Индексы с теми же именами уже есть в базах, созданных по новой db_schema.ddl,
+        # поэтому в базе они создаются через IF NOT EXISTS, а в состояние Django добавляются как обычно
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    f'CREATE INDEX IF NOT EXISTS {name} ON content.{table_name} ({columns})',
+                    reverse_sql=f'DROP INDEX IF EXISTS content.{name}',
+                )
+                for name, table_name, columns in (
+                    ('film_work_creation_date_idx', 'film_work', 'creation_date'),
+                    ('film_work_rating_idx', 'film_work', 'rating'),
+                    ('film_work_type_idx', 'film_work', 'type'),
+                    ('genre_film_work_rev_idx', 'genre_film_work', 'genre_id, film_work_id'),
+                    ('person_film_work_rev_idx', 'person_film_work', 'person_id, film_work_id'),
+                )
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='filmwork',
+                    index=models.Index(fields=['creation_date'], name='film_work_creation_date_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='filmwork',
+                    index=models.Index(fields=['rating'], name='film_work_rating_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='filmwork',
+                    index=models.Index(fields=['type'], name='film_work_type_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='genrefilmwork',
+                    index=models.Index(fields=['genre', 'film_work'], name='genre_film_work_rev_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='personfilmwork',
+                    index=models.Index(fields=['person', 'film_work'], name='person_film_work_rev_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,111 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+# Строка на фильм с уже собранными жанрами и персонами по ролям: читателям API и выгрузкам
+# не нужны пять таблиц с джойнами. Строки удалённых фильмов удаляет внешний ключ.
+FILM_WORK_FULL = """
+CREATE TABLE IF NOT EXISTS content.film_work_full (
+    id uuid PRIMARY KEY REFERENCES content.film_work (id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    description TEXT,
+    creation_date DATE,
+    rating FLOAT,
+    type TEXT NOT NULL,
+    genres TEXT[] NOT NULL DEFAULT '{}',
+    actors TEXT[] NOT NULL DEFAULT '{}',
+    directors TEXT[] NOT NULL DEFAULT '{}',
+    screenwriters TEXT[] NOT NULL DEFAULT '{}',
+    updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION content.refresh_film_work_full(film_work_ids uuid[]) RETURNS void AS $$
+    INSERT INTO content.film_work_full (id, title, description, creation_date, rating, type,
+                                        genres, actors, directors, screenwriters, updated_at)
+    SELECT fw.id, fw.title, fw.description, fw.creation_date, fw.rating, fw.type,
+           coalesce(genres.names, '{}'),
+           coalesce(persons.actors, '{}'),
+           coalesce(persons.directors, '{}'),
+           coalesce(persons.screenwriters, '{}'),
+           now()
+    FROM content.film_work fw
+    CROSS JOIN LATERAL (
+        SELECT array_agg(DISTINCT g.name ORDER BY g.name) AS names
+        FROM content.genre_film_work gfw
+        JOIN content.genre g ON g.id = gfw.genre_id
+        WHERE gfw.film_work_id = fw.id
+    ) genres
+    CROSS JOIN LATERAL (
+        SELECT array_agg(DISTINCT p.full_name ORDER BY p.full_name) FILTER (WHERE pfw.role = 'actor') AS actors,
+               array_agg(DISTINCT p.full_name ORDER BY p.full_name) FILTER (WHERE pfw.role = 'director') AS directors,
+               array_agg(DISTINCT p.full_name ORDER BY p.full_name)
+                   FILTER (WHERE pfw.role = 'screenwriter') AS screenwriters
+        FROM content.person_film_work pfw
+        JOIN content.person p ON p.id = pfw.person_id
+        WHERE pfw.film_work_id = fw.id
+    ) persons
+    WHERE film_work_ids IS NULL OR fw.id = ANY (film_work_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        title = EXCLUDED.title,
+        description = EXCLUDED.description,
+        creation_date = EXCLUDED.creation_date,
+        rating = EXCLUDED.rating,
+        type = EXCLUDED.type,
+        genres = EXCLUDED.genres,
+        actors = EXCLUDED.actors,
+        directors = EXCLUDED.directors,
+        screenwriters = EXCLUDED.screenwriters,
+        updated_at = EXCLUDED.updated_at;
+$$ LANGUAGE sql;
+
+SELECT content.refresh_film_work_full(NULL);
+"""
+
+DROP_FILM_WORK_FULL = """
+DROP FUNCTION IF EXISTS content.refresh_film_work_full(uuid[]);
+DROP TABLE IF EXISTS content.film_work_full;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            FILM_WORK_FULL,
+            reverse_sql=DROP_FILM_WORK_FULL,
+            state_operations=[
+                migrations.CreateModel(
+                    name='FilmworkFull',
+                    fields=[
+                        ('id', models.UUIDField(primary_key=True, serialize=False)),
+                        ('title', models.TextField()),
+                        ('description', models.TextField(null=True)),
+                        ('creation_date', models.DateField(null=True)),
+                        ('rating', models.FloatField(null=True)),
+                        ('type', models.TextField()),
+                        ('genres', django.contrib.postgres.fields.ArrayField(
+                            base_field=models.TextField(), size=None,
+                        )),
+                        ('actors', django.contrib.postgres.fields.ArrayField(
+                            base_field=models.TextField(), size=None,
+                        )),
+                        ('directors', django.contrib.postgres.fields.ArrayField(
+                            base_field=models.TextField(), size=None,
+                        )),
+                        ('screenwriters', django.contrib.postgres.fields.ArrayField(
+                            base_field=models.TextField(), size=None,
+                        )),
+                        ('updated_at', models.DateTimeField()),
+                    ],
+                    options={
+                        'db_table': 'content"."film_work_full',
+                        'managed': False,
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# У пары фильм-персона одна роль: на этот ключ опираются film_work_person_cnst модели,
+# ON CONFLICT загрузчика из sqlite и import_catalogue. Базы, созданные по db_schema.ddl до ревизии,
+# вместо него держат уникальный индекс film_work_person_role по (film_work_id, person_id, role).
+# Индекс удаляется, из повторов пары остаётся самая свежая строка, как при загрузке upsert,
+# и добавляется ограничение; на базах, созданных миграциями Django, блок ничего не меняет.
+FILM_WORK_PERSON_UNIQUE = """
+DROP INDEX IF EXISTS content.film_work_person_role;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'film_work_person_cnst' AND conrelid = 'content.person_film_work'::regclass
+    ) THEN
+        DELETE FROM content.person_film_work pfw
+        USING content.person_film_work newer
+        WHERE newer.film_work_id = pfw.film_work_id
+            AND newer.person_id = pfw.person_id
+            AND (coalesce(newer.created_at, '-infinity'), newer.id)
+                > (coalesce(pfw.created_at, '-infinity'), pfw.id);
+
+        ALTER TABLE content.person_film_work
+            ADD CONSTRAINT film_work_person_cnst UNIQUE (film_work_id, person_id);
+    END IF;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_film_work_full'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FILM_WORK_PERSON_UNIQUE, reverse_sql=migrations.RunSQL.noop),
+    ]
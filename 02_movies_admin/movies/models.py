@@ -1,7 +1,10 @@
 import uuid
 
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models
 from django.db.models import UniqueConstraint
 from django.utils.translation import gettext_lazy as _
 
@@ -24,6 +27,9 @@ class Genre(TimeStampedModel):
         verbose_name_plural = _('Genres')
         ordering = ('-name',)
         db_table = 'content\".\"genre'
+        indexes = [
+            GinIndex(fields=['name'], name='genre_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.name
@@ -40,6 +46,9 @@ class Person(TimeStampedModel):
         verbose_name_plural = _('Persons')
         ordering = ('-full_name',)
         db_table = 'content\".\"person'
+        indexes = [
+            GinIndex(fields=['full_name'], name='person_full_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.full_name
@@ -68,12 +77,21 @@ class Filmwork(TimeStampedModel):
     type = models.CharField(_("type"), max_length=20, choices=FilmworkType.choices)
     genres = models.ManyToManyField(Genre, through='GenreFilmwork')
     persons = models.ManyToManyField(Person, through='PersonFilmwork')
+    # Заполняется триггером в базе из title и description, см. миграцию 0002_search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = _('Movie')
         verbose_name_plural = _('Movies')
         ordering = ('-title',)
         db_table = 'content\".\"film_work'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='film_work_search_idx'),
+            GinIndex(fields=['title'], name='film_work_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['creation_date'], name='film_work_creation_date_idx'),
+            models.Index(fields=['rating'], name='film_work_rating_idx'),
+            models.Index(fields=['type'], name='film_work_type_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -96,6 +114,7 @@ class GenreFilmwork(models.Model):
         ]
         indexes = [
             models.Index(fields=['film_work', 'genre'], name='film_work_genre_idx'),
+            models.Index(fields=['genre', 'film_work'], name='genre_film_work_rev_idx'),
         ]
 
 
@@ -123,4 +142,39 @@ class PersonFilmwork(models.Model):
         ]
         indexes = [
             models.Index(fields=['film_work', 'person'], name='film_worlk_person_idx'),
+            models.Index(fields=['person', 'film_work'], name='person_film_work_rev_idx'),
         ]
+
+
+class FilmworkFull(models.Model):
+    """Фильм с названиями жанров и именами персон по ролям одной строкой.
+
+    Таблицу content.film_work_full заполняет функция content.refresh_film_work_full
+    (миграция 0004_film_work_full): сигналы обновляют строки изменённых фильмов после коммита,
+    команда refresh_film_work_full пересобирает таблицу целиком."""
+
+    id = models.UUIDField(primary_key=True)
+    title = models.TextField()
+    description = models.TextField(null=True)
+    creation_date = models.DateField(null=True)
+    rating = models.FloatField(null=True)
+    type = models.TextField()
+    genres = ArrayField(models.TextField())
+    actors = ArrayField(models.TextField())
+    directors = ArrayField(models.TextField())
+    screenwriters = ArrayField(models.TextField())
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'content\".\"film_work_full'
+
+    @staticmethod
+    def refresh(film_work_ids=None) -> None:
+        """Пересчитывает строки фильмов film_work_ids, None - все фильмы"""
+        if film_work_ids is not None:
+            film_work_ids = list(film_work_ids)
+            if not film_work_ids:
+                return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content.refresh_film_work_full(%s::uuid[])', [film_work_ids])
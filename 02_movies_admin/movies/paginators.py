@@ -0,0 +1,33 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который для нефильтрованного списка берёт число строк из статистики
+    postgres (pg_class.reltuples) вместо COUNT(*) по всей таблице.
+
+    Оценка используется, только если она не меньше estimate_threshold: на маленьких таблицах
+    точный подсчёт дешёвый, а статистика может быть устаревшей или ещё не собранной (-1)."""
+
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimated_count(queryset)
+            if estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimated_count(queryset) -> int:
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
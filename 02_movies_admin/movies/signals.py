@@ -0,0 +1,123 @@
+from threading import local
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache
+from .models import Filmwork, FilmworkFull, Genre, GenreFilmwork, Person, PersonFilmwork
+
+
+# Строки content.film_work_full и кеш обновляются после коммита: функция пересчёта
+# в отдельном запросе видит уже зафиксированные связи, а параллельный запрос не успеет
+# положить в кеш старые данные между сбросом и фиксацией транзакции
+
+
+def refresh_films(film_work_ids) -> None:
+    FilmworkFull.refresh(film_work_ids)
+    cache.invalidate_films(film_work_ids)
+
+
+def films_changed_on_commit(film_work_ids) -> None:
+    film_work_ids = list(film_work_ids)
+    transaction.on_commit(lambda: refresh_films(film_work_ids))
+
+
+def delete_links(queryset) -> int:
+    """Удаляет связи фильмов одним DELETE, без post_delete на каждую строку.
+
+    QuerySet.delete() при подписчиках post_delete сначала выбирает все строки, а затем на каждую
+    ставит в очередь свой пересчёт фильма. На таблицы связей никто не ссылается, каскадов нет;
+    фильмы пересчитывает вызывающий код одним films_changed_on_commit на пачку"""
+    connection = connections[queryset.db]
+    meta = queryset.model._meta
+    table, pk = connection.ops.quote_name(meta.db_table), connection.ops.quote_name(meta.pk.column)
+    try:
+        subquery, params = queryset.values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({subquery})', params)
+        return cursor.rowcount
+
+
+# Жанры и персоны, удаляемые в этом потоке: их фильмы уже поставлены в очередь одним пересчётом
+# в pre_delete, и каскадно удаляемые связи не ставят его ещё раз на каждую строку
+_deleting = local()
+
+
+def deleting_relations() -> set:
+    if not hasattr(_deleting, 'relations'):
+        _deleting.relations = set()
+    return _deleting.relations
+
+
+@receiver([post_save, post_delete], sender=Filmwork)
+def invalidate_film_work(sender, instance, **kwargs):
+    films_changed_on_commit([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=GenreFilmwork)
+@receiver([post_save, post_delete], sender=PersonFilmwork)
+def invalidate_film_work_link(sender, instance, signal, **kwargs):
+    relation = (Genre, instance.genre_id) if sender is GenreFilmwork else (Person, instance.person_id)
+    if signal is post_delete and relation in deleting_relations():
+        return
+    films_changed_on_commit([instance.film_work_id])
+
+
+@receiver(m2m_changed, sender=Filmwork.genres.through)
+@receiver(m2m_changed, sender=Filmwork.persons.through)
+def invalidate_film_work_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    """Связи, изменённые через film.genres.add()/remove()/clear() и обратные менеджеры"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            films_changed_on_commit([instance.pk])
+        return
+
+    # instance - жанр или персона, pk_set - id фильмов; при clear() их нужно запомнить заранее
+    link_field = 'genre' if sender is GenreFilmwork else 'person'
+    if action == 'pre_clear':
+        instance._cleared_film_work_ids = list(
+            sender.objects.filter(**{link_field: instance}).values_list('film_work_id', flat=True)
+        )
+    elif action == 'post_clear':
+        films_changed_on_commit(getattr(instance, '_cleared_film_work_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        films_changed_on_commit(pk_set or [])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Person)
+def invalidate_renamed_relation(sender, instance, created, **kwargs):
+    """Название жанра и имя персоны входят в ответы по всем их фильмам"""
+    if sender is Genre:
+        transaction.on_commit(cache.invalidate_genre_list)
+    if created:
+        return
+    if sender is Genre:
+        links = GenreFilmwork.objects.filter(genre=instance)
+    else:
+        links = PersonFilmwork.objects.filter(person=instance)
+    films_changed_on_commit(links.values_list('film_work_id', flat=True))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Person)
+def invalidate_deleted_relation(sender, instance, **kwargs):
+    """Фильмы удаляемого жанра или персоны пересчитываются один раз, а не на каждую каскадно удаляемую связь"""
+    if sender is Genre:
+        transaction.on_commit(cache.invalidate_genre_list)
+        links = GenreFilmwork.objects.filter(genre=instance)
+    else:
+        links = PersonFilmwork.objects.filter(person=instance)
+    films_changed_on_commit(links.values_list('film_work_id', flat=True))
+    deleting_relations().add((sender, instance.pk))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Person)
+def forget_deleted_relation(sender, instance, **kwargs):
+    # Связи удаляются раньше самого жанра или персоны, к этому моменту их post_delete уже отправлены
+    deleting_relations().discard((sender, instance.pk))
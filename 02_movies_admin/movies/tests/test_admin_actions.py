@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from movies.admin import FilmworkAdmin
+from movies.models import Filmwork, FilmworkFull, Genre, GenreFilmwork
+
+
+class FilmworkActionsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.genre = Genre.objects.create(name='Drama')
+        cls.films = Filmwork.objects.bulk_create(
+            Filmwork(title=f'Film {number}', type=Filmwork.FilmworkType.MOVIE) for number in range(7)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('admin:movies_filmwork_changelist')
+
+    def run_action(self, action, **fields):
+        data = {'action': action, 'select_across': 1, 'index': 0, helpers.ACTION_CHECKBOX_NAME: [self.films[0].pk]}
+        data.update(fields)
+        return self.client.post(self.url, data)
+
+    def test_set_rating_updates_all_rows_and_timestamp(self):
+        before = {film.pk: film.updated_at for film in Filmwork.objects.all()}
+        with mock.patch.object(FilmworkAdmin, 'action_chunk_size', 3):
+            self.run_action('set_rating', rating=7.5)
+        for film in Filmwork.objects.all():
+            self.assertEqual(film.rating, 7.5)
+            self.assertGreater(film.updated_at, before[film.pk])
+
+    def test_set_rating_requires_value(self):
+        self.run_action('set_rating')
+        self.assertFalse(Filmwork.objects.filter(rating__isnull=False).exists())
+
+    def test_add_genre_skips_existing_links(self):
+        GenreFilmwork.objects.create(film_work=self.films[0], genre=self.genre)
+        self.run_action('add_genre', genre=self.genre.pk)
+        self.assertEqual(GenreFilmwork.objects.filter(genre=self.genre).count(), len(self.films))
+
+    def test_remove_genre(self):
+        GenreFilmwork.objects.bulk_create(GenreFilmwork(film_work=film, genre=self.genre) for film in self.films)
+        FilmworkFull.refresh()
+        with mock.patch.object(FilmworkAdmin, 'action_chunk_size', 3), \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.run_action('remove_genre', genre=self.genre.pk)
+        self.assertFalse(GenreFilmwork.objects.filter(genre=self.genre).exists())
+        # Один пересчёт на пачку фильмов, а не на каждую удалённую связь
+        self.assertEqual(len(callbacks), 3)
+        self.assertFalse(FilmworkFull.objects.filter(genres__contains=[self.genre.name]).exists())
@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from movies.api.v1.views import MAX_PAGE_SIZE
+from movies.models import Filmwork, FilmworkFull
+
+
+class MoviesListApiTest(TestCase):
+
+    url = '/api/v1/movies/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Filmwork.objects.bulk_create(
+            Filmwork(title=f'Film {number}', type=Filmwork.FilmworkType.MOVIE) for number in range(3)
+        )
+        FilmworkFull.refresh()
+
+    def test_pages_follow_cursor(self):
+        first = self.client.get(self.url, {'page_size': 2}).json()
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNotNone(first['next_cursor'])
+
+        second = self.client.get(self.url, {'page_size': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next_cursor'])
+
+    def test_invalid_page_size(self):
+        for page_size in ('0', '-1', MAX_PAGE_SIZE + 1, 'ten', '1.5', ''):
+            with self.subTest(page_size=page_size):
+                response = self.client.get(self.url, {'page_size': page_size})
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-uuid'}).status_code, 400)
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork, PersonRole
+
+
+class ExportCatalogueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.film = Filmwork.objects.create(title='Film', type=Filmwork.FilmworkType.MOVIE, rating=8.1)
+            GenreFilmwork.objects.create(film_work=cls.film, genre=Genre.objects.create(name='Drama'))
+            PersonFilmwork.objects.create(film_work=cls.film, person=Person.objects.create(full_name='Ivan Petrov'),
+                                          role=PersonRole.actor, created_at=timezone.now())
+
+    def export(self, *args) -> str:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('export_catalogue', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue()
+
+    def test_ndjson(self):
+        films = [json.loads(line) for line in self.export('--format', 'ndjson').splitlines()]
+        self.assertEqual(len(films), 1)
+        self.assertEqual(films[0]['id'], str(self.film.pk))
+        self.assertEqual(films[0]['genres'], ['Drama'])
+        self.assertEqual(films[0]['persons'], {'screenwriter': [], 'actor': ['Ivan Petrov'], 'director': []})
+
+    def test_csv(self):
+        films = list(csv.DictReader(io.StringIO(self.export('--format', 'csv'))))
+        self.assertEqual(len(films), 1)
+        self.assertEqual(films[0]['title'], 'Film')
+        self.assertEqual(films[0]['actors'], 'Ivan Petrov')
+
+
+class ImportCatalogueTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def import_lines(self, *lines) -> list:
+        feed = os.path.join(self.directory.name, 'feed.ndjson')
+        rejects = os.path.join(self.directory.name, 'rejects.ndjson')
+        with open(feed, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        with self.captureOnCommitCallbacks(execute=True) as self.callbacks:
+            call_command('import_catalogue', feed, '--rejects', rejects, '--batch-size', '2', stdout=io.StringIO())
+        with open(rejects, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_import_and_reimport(self):
+        film = {'title': 'Film', 'type': 'movie', 'rating': 7, 'genres': ['Drama', 'Comedy'],
+                'persons': {'actor': ['Ivan Petrov'], 'director': ['Anna Ivanova']}}
+        rejected = self.import_lines(json.dumps(film), json.dumps({'title': 'Bad', 'type': 'cartoon'}), 'not json')
+        self.assertEqual([row['line'] for row in rejected], [2, 3])
+
+        imported = Filmwork.objects.get(title='Film')
+        self.assertEqual(sorted(imported.genres.values_list('name', flat=True)), ['Comedy', 'Drama'])
+        self.assertEqual(imported.personfilmwork_set.get(person__full_name='Anna Ivanova').role, PersonRole.director)
+
+        film.update(rating=9, genres=['Drama'], persons={'actor': ['Anna Ivanova']})
+        self.assertEqual(self.import_lines(json.dumps(film)), [])
+        # Лишние связи удаляются без сигналов на каждую строку: один пересчёт на пачку
+        self.assertEqual(len(self.callbacks), 1)
+
+        imported.refresh_from_db()
+        self.assertEqual(Filmwork.objects.filter(title='Film').count(), 1)
+        self.assertEqual(imported.rating, 9)
+        self.assertEqual(list(imported.genres.values_list('name', flat=True)), ['Drama'])
+        self.assertEqual(list(imported.personfilmwork_set.values_list('person__full_name', 'role')),
+                         [('Anna Ivanova', PersonRole.actor)])
+        self.assertEqual(Genre.objects.filter(name='Drama').count(), 1)
+        self.assertEqual(Person.objects.filter(full_name='Anna Ivanova').count(), 1)
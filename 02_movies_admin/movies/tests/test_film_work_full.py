@@ -0,0 +1,72 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from movies.models import Filmwork, FilmworkFull, Genre, GenreFilmwork, Person, PersonFilmwork, PersonRole
+from movies.signals import deleting_relations
+
+
+class FilmworkFullTest(TestCase):
+
+    def test_rows_follow_model_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            film = Filmwork.objects.create(title='Film', type=Filmwork.FilmworkType.MOVIE)
+            genre = Genre.objects.create(name='Drama')
+            person = Person.objects.create(full_name='Ivan Petrov')
+            GenreFilmwork.objects.create(film_work=film, genre=genre)
+            PersonFilmwork.objects.create(film_work=film, person=person, role=PersonRole.director,
+                                          created_at=timezone.now())
+
+        full = FilmworkFull.objects.get(id=film.pk)
+        self.assertEqual(full.genres, ['Drama'])
+        self.assertEqual(full.directors, ['Ivan Petrov'])
+        self.assertEqual(full.actors, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            genre.name = 'Comedy'
+            genre.save()
+        self.assertEqual(FilmworkFull.objects.get(id=film.pk).genres, ['Comedy'])
+
+        film.delete()
+        self.assertFalse(FilmworkFull.objects.filter(id=film.pk).exists())
+
+    def test_full_refresh_command(self):
+        films = Filmwork.objects.bulk_create(
+            Filmwork(title=f'Film {number}', type=Filmwork.FilmworkType.MOVIE) for number in range(5)
+        )
+        call_command('refresh_film_work_full', chunk_size=2, stdout=io.StringIO())
+        self.assertEqual(FilmworkFull.objects.filter(id__in=[film.pk for film in films]).count(), len(films))
+
+    def test_deleted_relation_refreshes_films_once(self):
+        films = Filmwork.objects.bulk_create(
+            Filmwork(title=f'Film {number}', type=Filmwork.FilmworkType.MOVIE) for number in range(3)
+        )
+        genre = Genre.objects.create(name='Drama')
+        person = Person.objects.create(full_name='Ivan Petrov')
+        with self.captureOnCommitCallbacks(execute=True):
+            for film in films:
+                GenreFilmwork.objects.create(film_work=film, genre=genre)
+                PersonFilmwork.objects.create(film_work=film, person=person, role=PersonRole.actor,
+                                              created_at=timezone.now())
+
+        # Один пересчёт всех фильмов на удаление, а не по одному на каждую каскадно удалённую связь
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            person.delete()
+        self.assertEqual(len(callbacks), 1)
+        # Сброс кеша списка жанров и один пересчёт фильмов
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            genre.delete()
+        self.assertEqual(len(callbacks), 2)
+
+        rows = FilmworkFull.objects.filter(id__in=[film.pk for film in films])
+        self.assertEqual(list(rows.values_list('genres', 'actors')), [([], [])] * len(films))
+
+        # После удаления связи снова сбрасывают свой фильм сами
+        self.assertFalse(deleting_relations())
+        other = Genre.objects.create(name='Comedy')
+        link = GenreFilmwork.objects.create(film_work=films[0], genre=other)
+        with self.captureOnCommitCallbacks() as callbacks:
+            link.delete()
+        self.assertEqual(len(callbacks), 1)
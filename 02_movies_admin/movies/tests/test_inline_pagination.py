@@ -0,0 +1,34 @@
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from movies.models import Genre, Person
+
+from .test_query_budget import create_films
+
+
+class InlinePaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.genre = Genre.objects.create(name='Comedy')
+        create_films(45, cls.genre, Person.objects.create(full_name='Ivan Petrov'))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_page_links_keep_other_params(self):
+        url = reverse('admin:movies_genre_change', args=[self.genre.pk])
+        page_param = self.client.get(url).context['inline_admin_formsets'][0].formset.page_param
+        # Фильтры списка и страница другого инлайна должны пережить переход по страницам
+        response = self.client.get(url, {'_changelist_filters': 'q=Com', 'other-page': 3, page_param: 2})
+
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.page.number, 2)
+        for query_string, number in ((formset.previous_page_query_string, '1'), (formset.next_page_query_string, '3')):
+            self.assertContains(response, f'href="{query_string.replace("&", "&amp;")}"')
+            params = parse_qs(urlsplit(query_string).query)
+            self.assertEqual(params, {'_changelist_filters': ['q=Com'], 'other-page': ['3'], page_param: [number]})
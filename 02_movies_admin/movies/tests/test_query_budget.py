@@ -0,0 +1,75 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from movies import cache
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork, PersonRole
+
+from .utils import QueryBudgetMixin
+
+
+def create_films(count: int, genre: Genre, person: Person) -> list:
+    films = Filmwork.objects.bulk_create(
+        Filmwork(title=f'Film {number}', type=Filmwork.FilmworkType.MOVIE, rating=5,
+                 creation_date=datetime.date(2000, 1, 1))
+        for number in range(count)
+    )
+    GenreFilmwork.objects.bulk_create(GenreFilmwork(film_work=film, genre=genre) for film in films)
+    PersonFilmwork.objects.bulk_create(
+        PersonFilmwork(film_work=film, person=person, role=PersonRole.actor, created_at=timezone.now())
+        for film in films
+    )
+    return films
+
+
+class AdminQueryBudgetTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.genre = Genre.objects.create(name='Comedy')
+        cls.person = Person.objects.create(full_name='Ivan Petrov')
+        cls.films = create_films(5, cls.genre, cls.person)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_filmwork_changelist(self):
+        url = reverse('admin:movies_filmwork_changelist')
+        _, few = self.get_with_queries(url)
+        create_films(30, self.genre, self.person)
+        self.assertQueryBudget(url, len(few))
+        self.assertQueryBudget(url, 10)
+
+    def test_filmwork_changelist_search(self):
+        self.assertQueryBudget(reverse('admin:movies_filmwork_changelist') + '?q=Film', 10)
+
+    def test_filmwork_change_view(self):
+        self.assertQueryBudget(reverse('admin:movies_filmwork_change', args=[self.films[0].pk]), 10)
+
+    def test_genre_change_view(self):
+        url = reverse('admin:movies_genre_change', args=[self.genre.pk])
+        _, few = self.get_with_queries(url)
+        create_films(30, self.genre, self.person)
+        self.assertQueryBudget(url, len(few))
+
+    def test_person_change_view(self):
+        url = reverse('admin:movies_person_change', args=[self.person.pk])
+        _, few = self.get_with_queries(url)
+        create_films(30, self.genre, self.person)
+        self.assertQueryBudget(url, len(few))
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('admin:movies_genre_changelist'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('queries', response['Server-Timing'])
+
+    async def test_server_timing_header_async(self):
+        # AsyncClient проходит стек middleware в асинхронном режиме, как под ASGI
+        cache.invalidate_genre_list()
+        response = await self.async_client.get('/api/v1/genres/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
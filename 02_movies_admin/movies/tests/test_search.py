@@ -0,0 +1,43 @@
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase
+
+from movies.models import Filmwork, Genre, Person
+
+
+class AdminSearchIndexTest(TestCase):
+    """Поиск в админке должен идти по GIN-индексам, а не полным чтением таблицы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Filmwork.objects.create(title='Star Wars', type=Filmwork.FilmworkType.MOVIE)
+        Genre.objects.create(name='Science fiction')
+        Person.objects.create(full_name='Harrison Ford')
+
+    def search(self, model, term):
+        model_admin = admin.site._registry[model]
+        queryset, _ = model_admin.get_search_results(RequestFactory().get('/'), model.objects.all(), term)
+        return queryset
+
+    def explain(self, queryset) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_substring_search_finds_rows(self):
+        self.assertEqual(self.search(Filmwork, 'STAR W').count(), 1)
+        self.assertEqual(self.search(Genre, 'FICT').count(), 1)
+        self.assertEqual(self.search(Person, 'ford').count(), 1)
+        self.assertEqual(self.search(Person, '100%').count(), 0)
+
+    def test_search_uses_indexes(self):
+        for model, term, indexes in (
+            (Filmwork, 'wars', ('film_work_search_idx', 'film_work_title_trgm_idx')),
+            (Genre, 'fict', ('genre_name_trgm_idx',)),
+            (Person, 'ford', ('person_full_name_trgm_idx',)),
+        ):
+            with self.subTest(model=model.__name__):
+                plan = self.explain(self.search(model, term))
+                self.assertNotIn('Seq Scan', plan)
+                for index in indexes:
+                    self.assertIn(index, plan)
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, override_settings
+
+from movies import db
+
+
+def show_timeout(wrapper) -> str:
+    with wrapper.cursor() as cursor:
+        cursor.execute('SHOW statement_timeout')
+        return cursor.fetchone()[0]
+
+
+@override_settings(DB_STATEMENT_TIMEOUT=100)
+class StatementTimeoutTest(TestCase):
+    """Таймаут получают только соединения веб-процесса. Новое соединение открывается
+    отдельно от соединения теста, как в свежем процессе"""
+
+    def new_connection(self):
+        wrapper = connections.create_connection('default')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_not_in_connection_options(self):
+        # Иначе таймаут достался бы и migrate, и командам выгрузки
+        self.assertNotIn('statement_timeout', settings.DATABASES['default']['OPTIONS'].get('options', ''))
+
+    def test_first_request_sets_open_connections(self):
+        with mock.patch.object(db, 'serving_requests', False):
+            db.start_statement_timeout()
+            self.assertTrue(db.serving_requests)
+        self.assertEqual(show_timeout(connection), '100ms')
+
+    def test_request_query_is_cancelled(self):
+        with mock.patch.object(db, 'serving_requests', True), self.new_connection().cursor() as cursor:
+            with self.assertRaises(OperationalError):
+                cursor.execute('SELECT pg_sleep(1)')
+
+    def test_command_connection_has_no_timeout(self):
+        # manage.py migrate и команды не отправляют request_started
+        with mock.patch.object(db, 'serving_requests', False):
+            wrapper = self.new_connection()
+            self.assertEqual(show_timeout(wrapper), '0')
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT pg_sleep(0.3)')
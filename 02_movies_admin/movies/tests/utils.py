@@ -0,0 +1,19 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверки для TestCase: страница укладывается в бюджет запросов, и он не растёт вместе с данными"""
+
+    def get_with_queries(self, url: str):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response, context.captured_queries
+
+    def assertQueryBudget(self, url: str, budget: int):
+        response, queries = self.get_with_queries(url)
+        if len(queries) > budget:
+            listing = '\n'.join(f'{number}. {query["sql"]}' for number, query in enumerate(queries, 1))
+            self.fail(f'{url}: {len(queries)} queries, budget {budget}\n{listing}')
+        return response
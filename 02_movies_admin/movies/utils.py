@@ -0,0 +1,11 @@
+def iter_pk_chunks(queryset, chunk_size: int):
+    """Первичные ключи queryset пачками по chunk_size, по порядку pk без OFFSET"""
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(chunk[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
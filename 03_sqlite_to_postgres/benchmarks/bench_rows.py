@@ -0,0 +1,95 @@
+"""Сравнение пути строки от курсора sqlite до параметров запроса в postgres на коде загрузчика.
+
+dataclass - sqlite3.Row -> датакласс через **row (SqliteMenedger.to_data_classes, как в fetch_data)
+            -> кортеж (PostgreMenedger.to_rows);
+iter-data - кортеж из курсора -> датакласс по карте колонок (SqliteMenedger.iter_data) -> кортеж;
+iter-rows - кортеж из курсора сразу идёт параметрами запроса (SqliteMenedger.iter_rows), как в Migrator.
+
+    python 03_sqlite_to_postgres/benchmarks/bench_rows.py --rows 200000
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_classes import COLUMNS  # noqa: E402
+from psql_manager import PostgreMenedger  # noqa: E402
+from sqlite_manager import SqliteMenedger  # noqa: E402
+
+TABLE = 'film_work'
+
+
+def make_db(path: Path, rows: int) -> None:
+    db = sqlite3.connect(path)
+    db.execute(f"CREATE TABLE {TABLE} ({', '.join(COLUMNS[TABLE])})")
+    db.executemany(
+        f"INSERT INTO {TABLE} ({', '.join(COLUMNS[TABLE])}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((str(uuid.uuid4()), f'Film {i}', 'Some description ' * 5, '2021-06-16', None, 7.5, 'movie',
+          '2021-06-16 20:14:09.221838+00', '2021-06-16 20:14:09.221838+00') for i in range(rows)),
+    )
+    db.commit()
+    db.close()
+
+
+def dataclass_rows(sqlite: SqliteMenedger, batch_size: int) -> list:
+    cursor = sqlite.db.execute(f"SELECT {', '.join(COLUMNS[TABLE])} FROM {TABLE} ORDER BY rowid")
+    params = []
+    while rows_pack := cursor.fetchmany(batch_size):
+        params = list(PostgreMenedger.to_rows(TABLE, sqlite.to_data_classes(TABLE, rows_pack)))
+    return params
+
+
+def iter_data_rows(sqlite: SqliteMenedger, batch_size: int) -> list:
+    params = []
+    for _, data_pack in sqlite.iter_data(TABLE, batch_size):
+        params = list(PostgreMenedger.to_rows(TABLE, data_pack))
+    return params
+
+
+def iter_rows(sqlite: SqliteMenedger, batch_size: int) -> list:
+    params = []
+    for _, rows_pack in sqlite.iter_rows(TABLE, batch_size):
+        params = list(PostgreMenedger.to_rows(TABLE, rows_pack))
+    return params
+
+
+PATHS = {'dataclass': dataclass_rows, 'iter-data': iter_data_rows, 'iter-rows': iter_rows}
+
+
+def measure(name: str, path, sqlite: SqliteMenedger, rows: int, batch_size: int) -> None:
+    started = time.process_time()
+    path(sqlite, batch_size)
+    cpu = time.process_time() - started
+
+    # Память меряется отдельно: tracemalloc сам по себе замедляет выполнение
+    tracemalloc.start()
+    last_pack = path(sqlite, batch_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{name:>9}: {cpu / rows * 1e6:7.2f} us/row CPU, '
+          f'{peak / len(last_pack):8.0f} B/row peak in a batch of {batch_size}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / 'rows.sqlite'
+        make_db(source, args.rows)
+        sqlite = SqliteMenedger(path=str(source), read_only=True)
+        try:
+            for name, path in PATHS.items():
+                measure(name, path, sqlite, args.rows, args.batch_size)
+        finally:
+            sqlite.db.close()
@@ -0,0 +1,256 @@
+"""Нагрузочный прогон переноса sqlite -> postgres на синтетических данных.
+
+Генерирует базу sqlite с таблицами из db_schema.ddl заданного размера и переносит каждую таблицу
+через Migrator.migrate_table в postgres (настройки из 03_sqlite_to_postgres/.env) или, если postgres
+недоступен или указан --stand-in, в файл sqlite с той же семантикой upsert.
+Каждая таблица переносится в отдельном процессе, поэтому пиковый RSS относится только к ней
+(в него входят интерпретатор и прочитанные страницы mmap источника). Для каждой таблицы печатает
+строк в секунду и время стадий extract/transform/load из MigrationMetrics: чтение и запись идут
+в разных потоках, и стадии перекрываются. Результаты сохраняются в json для сравнения прогонов.
+
+    python 03_sqlite_to_postgres/benchmarks/etl_bench.py --films 100000
+    python 03_sqlite_to_postgres/benchmarks/etl_bench.py --films 100000 --compare results/<прошлый>.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_classes import COLUMNS, LINK_TABLES, PARENT_TABLES  # noqa: E402
+from metrics import MigrationMetrics  # noqa: E402
+from migrator import Migrator  # noqa: E402
+from psql_manager import PostgreMenedger  # noqa: E402
+from sqlite_manager import SqliteMenedger  # noqa: E402
+from state import MigrationState  # noqa: E402
+
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+CONFLICT_KEYS = {
+    "genre": ('id',),
+    "film_work": ('id',),
+    "genre_film_work": ('id',),
+    "person": ('id',),
+    "person_film_work": ('film_work_id', 'person_id'),
+}
+
+
+def create_tables(db: sqlite3.Connection) -> None:
+    for table_name, columns in COLUMNS.items():
+        db.execute(f"CREATE TABLE {table_name} ({', '.join(columns)}, PRIMARY KEY (id))")
+        if CONFLICT_KEYS[table_name] != ('id',):
+            keys = ', '.join(CONFLICT_KEYS[table_name])
+            db.execute(f"CREATE UNIQUE INDEX {table_name}_uniq ON {table_name} ({keys})")
+
+
+def generate_source(path: Path, films: int, persons: int, genres: int, seed: int = 0) -> dict[str, int]:
+    """Создаёт базу sqlite с синтетическими данными и возвращает число строк в каждой таблице"""
+    path.unlink(missing_ok=True)
+    rnd = random.Random(seed)
+    started = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+    def moment() -> str:
+        return str(started + timedelta(seconds=rnd.randrange(10 ** 7)))
+
+    def ids(count: int) -> list[str]:
+        return [str(uuid.UUID(int=rnd.getrandbits(128), version=4)) for _ in range(count)]
+
+    genre_ids, person_ids, film_ids = ids(genres), ids(persons), ids(films)
+
+    db = sqlite3.connect(path)
+    create_tables(db)
+    db.executemany("INSERT INTO genre VALUES (?, ?, ?, ?, ?)",
+                   ((genre_id, f'Genre {i}', 'Genre description', moment(), moment())
+                    for i, genre_id in enumerate(genre_ids)))
+    db.executemany("INSERT INTO person VALUES (?, ?, ?, ?)",
+                   ((person_id, f'Person {i}', moment(), moment()) for i, person_id in enumerate(person_ids)))
+    db.executemany("INSERT INTO film_work VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                   ((film_id, f'Film {i}', 'Film description ' * 10, '2021-06-16', None,
+                     round(rnd.uniform(0, 10), 1), rnd.choice(('movie', 'tv_show')), moment(), moment())
+                    for i, film_id in enumerate(film_ids)))
+    db.executemany("INSERT INTO genre_film_work VALUES (?, ?, ?, ?)",
+                   ((str(uuid.uuid4()), film_id, genre_id, moment())
+                    for film_id in film_ids for genre_id in rnd.sample(genre_ids, min(2, genres))))
+    db.executemany("INSERT INTO person_film_work VALUES (?, ?, ?, ?, ?)",
+                   ((str(uuid.uuid4()), film_id, person_id, rnd.choice(('actor', 'director', 'screenwriter')),
+                     moment())
+                    for film_id in film_ids for person_id in rnd.sample(person_ids, min(5, persons))))
+    db.commit()
+
+    counts = {table_name: db.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0] for table_name in COLUMNS}
+    db.close()
+    return counts
+
+
+class SqliteStandIn:
+    """Заменитель PostgreMenedger для машин без postgres: пишет в файл sqlite
+    тем же INSERT ... ON CONFLICT DO UPDATE, что и sql_command"""
+
+    mode = 'upsert'
+    to_rows = staticmethod(PostgreMenedger.to_rows)
+
+    def __init__(self, path: Path) -> None:
+        self.db = sqlite3.connect(path)
+        self.columns = COLUMNS
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        yield self.db
+
+    def insert_data(self, table_name: str, data_pack: Iterable, conn: sqlite3.Connection) -> None:
+        columns = self.columns[table_name]
+        updates = ', '.join(f'{column}=excluded.{column}' for column in columns if column != 'id')
+        conn.executemany(
+            f"""INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})
+                ON CONFLICT ({', '.join(CONFLICT_KEYS[table_name])}) DO UPDATE SET {updates}""",
+            data_pack,
+        )
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def prepare_target(args: argparse.Namespace) -> tuple[str, Path]:
+    """Проверяет, доступен ли postgres, и готовит цель переноса.
+
+    Returns:
+        tuple[str, Path]: Имя цели и файл sqlite-заменителя, None для postgres
+    """
+    if not args.stand_in:
+        try:
+            with PostgreMenedger('content', mode=args.mode, pool_size=1) as loader:
+                if args.truncate:
+                    with loader.connection() as conn, conn.cursor() as cursor:
+                        cursor.execute(f"TRUNCATE {', '.join(f'content.{table_name}' for table_name in COLUMNS)}")
+                        conn.commit()
+            return f'postgres-{args.mode}', None
+        except Exception as error:
+            print(f'postgres недоступен ({error!r}), используется sqlite', file=sys.stderr)
+
+    stand_in = args.source.with_name(f'{args.source.stem}-target.sqlite')
+    stand_in.unlink(missing_ok=True)
+    db = sqlite3.connect(stand_in)
+    create_tables(db)
+    db.close()
+    return 'sqlite-stand-in', stand_in
+
+
+def peak_rss_mb() -> float:
+    # На linux ru_maxrss в килобайтах, на macos - в байтах
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if platform.system() == 'Darwin' else rss / 1024
+
+
+def bench_table(table_name: str, options: dict, stand_in: Path = None) -> dict:
+    """Переносит одну таблицу через Migrator.migrate_table; вызывается в отдельном процессе,
+    чтобы ru_maxrss, который растёт за всю жизнь процесса, относился к одной таблице"""
+    sqlite = SqliteMenedger(path=options['sqlite_path'])
+    try:
+        rows_total = sqlite.get_count_rows(table_name)
+    finally:
+        sqlite.db.close()
+
+    metrics = MigrationMetrics(stream=io.StringIO())
+    metrics.register_table(table_name, rows_total)
+    postgre = SqliteStandIn(stand_in) if stand_in else None
+    migrator = Migrator(**options, workers=1, pool_size=1, state=MigrationState(path=None), metrics=metrics,
+                        postgre=postgre)
+    started = time.perf_counter()
+    try:
+        migrator.migrate_table(table_name)
+    finally:
+        migrator.close()
+    elapsed = time.perf_counter() - started
+
+    stats = metrics.tables[table_name]
+    return {
+        'rows': stats.rows_done,
+        'seconds': round(elapsed, 4),
+        'rows_per_second': round(stats.rows_done / elapsed) if elapsed else None,
+        'stages': {stage: round(seconds, 4) for stage, seconds in stats.stages.items()},
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def print_results(results: dict, previous: dict = None) -> None:
+    print(f"{'table':<18}{'rows':>10}{'rows/s':>12}{'extract':>10}{'transform':>11}{'load':>10}{'rss MB':>9}")
+    for table_name, table in results['tables'].items():
+        stages = table['stages']
+        line = (f"{table_name:<18}{table['rows']:>10}{table['rows_per_second']:>12}"
+                f"{stages['extract']:>10.3f}{stages['transform']:>11.3f}{stages['load']:>10.3f}"
+                f"{table['peak_rss_mb']:>9.1f}")
+        old = (previous or {}).get('tables', {}).get(table_name)
+        if old and old.get('rows_per_second'):
+            line += f"  {table['rows_per_second'] / old['rows_per_second'] - 1:+.1%} rows/s"
+        print(line)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--films', type=int, default=10_000)
+    parser.add_argument('--persons', type=int, default=None, help='По умолчанию - вдвое больше фильмов')
+    parser.add_argument('--genres', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--commit-size', type=int, default=5000)
+    parser.add_argument('--mode', choices=('insert', 'upsert', 'copy'), default='copy')
+    parser.add_argument('--source', type=Path, default=Path('/tmp/etl_bench.sqlite'),
+                        help='Куда сохранить сгенерированную базу sqlite')
+    parser.add_argument('--stand-in', action='store_true', help='Писать в файл sqlite вместо postgres')
+    parser.add_argument('--truncate', action='store_true', help='Очистить таблицы content.* перед прогоном')
+    parser.add_argument('--compare', type=Path, help='json прошлого прогона для сравнения')
+    args = parser.parse_args()
+
+    counts = generate_source(args.source, args.films, args.persons or args.films * 2, args.genres)
+    target, stand_in = prepare_target(args)
+    options = {
+        'mode': args.mode if stand_in is None else SqliteStandIn.mode,
+        'batch_size': args.batch_size,
+        'commit_size': args.commit_size,
+        'sqlite_path': str(args.source),
+    }
+
+    results = {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'target': target,
+        'params': {key: str(value) for key, value in vars(args).items()},
+        'tables': {},
+    }
+    # spawn, как у Migrator: каждый процесс начинает с чистого интерпретатора
+    context = multiprocessing.get_context('spawn')
+    for table_name in PARENT_TABLES + LINK_TABLES:
+        with ProcessPoolExecutor(1, mp_context=context) as process:
+            results['tables'][table_name] = process.submit(bench_table, table_name, options, stand_in).result()
+
+    total_rows = sum(table['rows'] for table in results['tables'].values())
+    total_seconds = sum(table['seconds'] for table in results['tables'].values())
+    results['total'] = {
+        'rows': total_rows,
+        'seconds': round(total_seconds, 4),
+        'rows_per_second': round(total_rows / total_seconds) if total_seconds else None,
+        'peak_rss_mb': max(table['peak_rss_mb'] for table in results['tables'].values()),
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{target}.json"
+    result_path.write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+    previous = json.loads(args.compare.read_text(encoding='utf-8')) if args.compare else None
+    print(f'target: {target}, source rows: {counts}')
+    print_results(results, previous)
+    print(f"total: {total_rows} rows in {total_seconds:.2f}s, peak RSS {results['total']['peak_rss_mb']} MB")
+    print(f'saved to {result_path}')
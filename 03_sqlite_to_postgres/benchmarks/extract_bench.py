@@ -0,0 +1,86 @@
+"""Скорость стадии extract: чтение всех таблиц источника sqlite через SqliteMenedger без записи в postgres.
+
+defaults - SqliteMenedger.iter_rows с настройками sqlite по умолчанию: обычное соединение на запись,
+           без mmap, cache_size 2 МБ;
+tuned - SqliteMenedger.iter_rows, как читает Migrator: read-only URI, mmap_size и cache_size загрузчика;
+tuned-data - то же, но пачки датаклассов SqliteMenedger.iter_data.
+
+Чтобы увидеть выигрыш mmap, источник должен быть порядка нескольких ГБ: готовый файл передаётся
+через --source, иначе генерируется синтетический на --films фильмов (~2.5 ГБ на 1 000 000).
+Первый прогон читает файл с диска, остальные - из кеша ОС; --repeat повторяет прогоны по кругу.
+
+    python 03_sqlite_to_postgres/benchmarks/extract_bench.py --films 1000000 --repeat 2
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_classes import LINK_TABLES, PARENT_TABLES  # noqa: E402
+from etl_bench import generate_source  # noqa: E402
+from sqlite_manager import SqliteMenedger  # noqa: E402
+
+
+# Настройки sqlite по умолчанию: mmap выключен, cache_size = -2000, то есть 2000 КиБ
+SQLITE_DEFAULTS = {'mmap_size': 0, 'cache_size_kib': 2000}
+
+
+def defaults(path: Path, table_name: str, batch_size: int) -> int:
+    sqlite = SqliteMenedger(path=str(path), **SQLITE_DEFAULTS)
+    try:
+        return sum(len(rows_pack) for _, rows_pack in sqlite.iter_rows(table_name, batch_size))
+    finally:
+        sqlite.db.close()
+
+
+def tuned(path: Path, table_name: str, batch_size: int) -> int:
+    sqlite = SqliteMenedger(path=str(path), read_only=True)
+    try:
+        return sum(len(rows_pack) for _, rows_pack in sqlite.iter_rows(table_name, batch_size))
+    finally:
+        sqlite.db.close()
+
+
+def tuned_data(path: Path, table_name: str, batch_size: int) -> int:
+    sqlite = SqliteMenedger(path=str(path), read_only=True)
+    try:
+        return sum(len(data_pack) for _, data_pack in sqlite.iter_data(table_name, batch_size))
+    finally:
+        sqlite.db.close()
+
+
+READERS = {'defaults': defaults, 'tuned': tuned, 'tuned-data': tuned_data}
+
+
+def measure(path: Path, reader, batch_size: int) -> tuple[int, float]:
+    rows = 0
+    started = time.perf_counter()
+    for table_name in PARENT_TABLES + LINK_TABLES:
+        rows += reader(path, table_name, batch_size)
+    return rows, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', type=Path, help='Готовая база sqlite, по умолчанию генерируется синтетическая')
+    parser.add_argument('--films', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--readers', nargs='+', choices=READERS, default=list(READERS))
+    args = parser.parse_args()
+
+    path = args.source
+    if path is None:
+        path = Path('/tmp/extract_bench.sqlite')
+        print(f'generating {path}: {generate_source(path, args.films, args.films * 2, 30)}')
+    size_mb = path.stat().st_size / 2 ** 20
+    print(f'source {path}: {size_mb:.0f} MB')
+
+    for run in range(1, args.repeat + 1):
+        for name in args.readers:
+            rows, seconds = measure(path, READERS[name], args.batch_size)
+            print(f'run {run} {name:>10}: {rows} rows in {seconds:.2f}s, '
+                  f'{rows / seconds:10.0f} rows/s, {size_mb / seconds:7.1f} MB/s')
@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Iterator
+
+from psql_manager import PostgreMenedger
+from sqlite_manager import SqliteMenedger
+
+
+TIMESTAMP_COLUMNS = ('created_at', 'updated_at')
+DATE_COLUMNS = ('creation_date',)
+FLOAT_COLUMNS = ('rating',)
+
+# Разделитель полей и отметка NULL в каноническом представлении строки
+SEPARATOR = '\x1f'
+NULL = '\\N'
+
+
+@dataclass
+class TableReport:
+    table_name: str
+    source_rows: int = 0
+    target_rows: int = 0
+    missing: list[str] = field(default_factory=list)
+    extra: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.extra or self.changed)
+
+
+def uuid_bounds(prefix: str) -> tuple[str, str]:
+    """Возвращает наименьший и наибольший uuid, начинающиеся с prefix (не длиннее 8 символов)"""
+    tail = 8 - len(prefix)
+    return (f'{prefix}{"0" * tail}-0000-0000-0000-000000000000',
+            f'{prefix}{"f" * tail}-ffff-ffff-ffff-ffffffffffff')
+
+
+class ConsistencyChecker:
+    """Сверяет таблицы sqlite и postgres по контрольным суммам.
+
+    Строки каждой таблицы приводятся к каноническому тексту и хешируются (в postgres - на стороне базы),
+    затем хеши строк, упорядоченных по id, сворачиваются в хеш корзины - группы id с общим префиксом.
+    Построчно сравниваются только корзины, хеши которых не совпали, поэтому время работы
+    линейно по размеру таблицы, а по сети из postgres идёт по одной строке на корзину."""
+
+    def __init__(self, sqlite: SqliteMenedger, postgre: PostgreMenedger, prefix_length: int = 2) -> None:
+        if not 1 <= prefix_length <= 8:
+            raise ValueError('Длина префикса корзины должна быть от 1 до 8')
+        self.sqlite = sqlite
+        self.postgre = postgre
+        self.prefix_length = prefix_length
+
+    def check(self) -> list[TableReport]:
+        return [self.check_table(table_name) for table_name in self.postgre.sql_command.keys()]
+
+    def check_table(self, table_name: str) -> TableReport:
+        """Сравнивает таблицу целиком и возвращает отчёт с id отсутствующих, лишних и изменённых строк"""
+        report = TableReport(table_name)
+        source = self.sqlite_buckets(table_name)
+        target = self.postgres_buckets(table_name)
+        report.source_rows = sum(rows for rows, _ in source.values())
+        report.target_rows = sum(rows for rows, _ in target.values())
+
+        for bucket in sorted(source.keys() | target.keys()):
+            if source.get(bucket) == target.get(bucket):
+                continue
+
+            source_rows = dict(self.sqlite_row_hashes(table_name, bucket))
+            target_rows = dict(self.postgres_row_hashes(table_name, bucket))
+            report.missing.extend(sorted(source_rows.keys() - target_rows.keys()))
+            report.extra.extend(sorted(target_rows.keys() - source_rows.keys()))
+            report.changed.extend(sorted(
+                row_id for row_id in source_rows.keys() & target_rows.keys()
+                if source_rows[row_id] != target_rows[row_id]
+            ))
+
+        return report
+
+    def postgres_expression(self, column: str) -> str:
+        """SQL-выражение, дающее в postgres тот же текст, что canonical_value в python"""
+        if column in TIMESTAMP_COLUMNS:
+            expression = f"to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.US')"
+        elif column in DATE_COLUMNS:
+            expression = f"to_char({column}, 'YYYY-MM-DD')"
+        elif column in FLOAT_COLUMNS:
+            expression = f"round({column}::numeric, 6)::text"
+        else:
+            expression = f"{column}::text"
+        return f"coalesce({expression}, %(null)s)"
+
+    def postgres_rows_query(self, table_name: str) -> str:
+        columns = self.postgre.columns[table_name]
+        expressions = ', '.join(self.postgres_expression(column) for column in columns)
+        return f"""
+                SELECT id, md5(concat_ws(%(separator)s, {expressions})) AS row_hash
+                FROM {self.postgre.schema}.{table_name}
+                """
+
+    def postgres_buckets(self, table_name: str) -> dict[str, tuple[int, str]]:
+        query = f"""
+                SELECT left(id::text, %(prefix_length)s) AS bucket, count(*),
+                    md5(string_agg(row_hash, '' ORDER BY id))
+                FROM ({self.postgres_rows_query(table_name)}) AS row_hashes
+                GROUP BY bucket
+                """
+        params = {'separator': SEPARATOR, 'null': NULL, 'prefix_length': self.prefix_length}
+        with self.postgre.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return {bucket: (rows, digest) for bucket, rows, digest in cursor}
+
+    def postgres_row_hashes(self, table_name: str, bucket: str) -> list[tuple[str, str]]:
+        query = f"""
+                SELECT id::text, row_hash FROM ({self.postgres_rows_query(table_name)}) AS row_hashes
+                WHERE id BETWEEN %(lower)s AND %(upper)s
+                """
+        lower, upper = uuid_bounds(bucket)
+        params = {'separator': SEPARATOR, 'null': NULL, 'lower': lower, 'upper': upper}
+        with self.postgre.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def canonical_value(column: str, value) -> str:
+        if value is None:
+            return NULL
+        if column in TIMESTAMP_COLUMNS:
+            moment = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            return moment.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+        if column in DATE_COLUMNS:
+            return (value if isinstance(value, date) else date.fromisoformat(str(value)[:10])).isoformat()
+        if column in FLOAT_COLUMNS:
+            return f'{float(value):.6f}'
+        return str(value)
+
+    def iter_sqlite_row_hashes(self, table_name: str, where: str = '',
+                               params: tuple = ()) -> Iterator[tuple[str, str]]:
+        """Отдаёт пары (id, md5 канонической строки) из sqlite в порядке id"""
+        columns = self.postgre.columns[table_name]
+        cursor = self.sqlite.db.cursor()
+        cursor.row_factory = None
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table_name} {where} ORDER BY id", params)
+            id_index = columns.index('id')
+            for row in cursor:
+                text = SEPARATOR.join(self.canonical_value(column, value) for column, value in zip(columns, row))
+                yield str(row[id_index]).lower(), hashlib.md5(text.encode('utf-8')).hexdigest()
+        finally:
+            cursor.close()
+
+    def sqlite_buckets(self, table_name: str) -> dict[str, tuple[int, str]]:
+        buckets = {}
+        bucket, rows, digest = None, 0, None
+
+        for row_id, row_hash in self.iter_sqlite_row_hashes(table_name):
+            row_bucket = row_id[:self.prefix_length]
+            if row_bucket != bucket:
+                if bucket is not None:
+                    buckets[bucket] = (rows, digest.hexdigest())
+                bucket, rows, digest = row_bucket, 0, hashlib.md5()
+            rows += 1
+            digest.update(row_hash.encode('ascii'))
+
+        if bucket is not None:
+            buckets[bucket] = (rows, digest.hexdigest())
+        return buckets
+
+    def sqlite_row_hashes(self, table_name: str, bucket: str) -> list[tuple[str, str]]:
+        return list(self.iter_sqlite_row_hashes(table_name, 'WHERE id BETWEEN ? AND ?', uuid_bounds(bucket)))
+
+
+def print_report(report: TableReport) -> None:
+    status = 'OK' if report.ok else 'MISMATCH'
+    print(f'{report.table_name}: {status} (sqlite {report.source_rows}, postgres {report.target_rows})')
+    for title, ids in (('missing', report.missing), ('extra', report.extra), ('changed', report.changed)):
+        if ids:
+            print(f'  {title} ({len(ids)}): {", ".join(ids)}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Сверка данных sqlite и postgres по контрольным суммам')
+    parser.add_argument('--prefix-length', type=int, default=2,
+                        help='Длина префикса id, по которому строки группируются в корзины')
+    args = parser.parse_args()
+
+    with PostgreMenedger('content') as postgre:
+        checker = ConsistencyChecker(SqliteMenedger(), postgre, prefix_length=args.prefix_length)
+        reports = checker.check()
+
+    for report in reports:
+        print_report(report)
+
+    raise SystemExit(0 if all(report.ok for report in reports) else 1)
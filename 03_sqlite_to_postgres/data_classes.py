@@ -1,9 +1,10 @@
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Union
 
 
-@dataclass
+@dataclass(slots=True)
 class Filmwork:
     title: str
     description: str
@@ -16,7 +17,7 @@ class Filmwork:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
 
 
-@dataclass
+@dataclass(slots=True)
 class Genre:
     name: str
     description: str
@@ -25,7 +26,7 @@ class Genre:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
 
 
-@dataclass
+@dataclass(slots=True)
 class GenreFilmwork:
     film_work_id: str
     genre_id: str
@@ -33,7 +34,7 @@ class GenreFilmwork:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
 
 
-@dataclass
+@dataclass(slots=True)
 class Person:
     full_name: str
     created_at: datetime
@@ -41,10 +42,30 @@ class Person:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonFilmwork:
     film_work_id: str
     person_id: str
     role: str
     created_at: datetime
     id: uuid.UUID = field(default_factory=uuid.uuid4)
+
+
+DataClass = Union[Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork]
+
+# Строка таблицы в виде кортежа значений в порядке COLUMNS
+Row = tuple
+
+# Порядок колонок, в котором строки читаются из sqlite и передаются в postgres
+COLUMNS = {
+    "genre": ('id', 'name', 'description', 'created_at', 'updated_at'),
+    "film_work": ('id', 'title', 'description', 'creation_date', 'file_path', 'rating', 'type',
+                  'created_at', 'updated_at'),
+    "genre_film_work": ('id', 'film_work_id', 'genre_id', 'created_at'),
+    "person": ('id', 'full_name', 'created_at', 'updated_at'),
+    "person_film_work": ('id', 'film_work_id', 'person_id', 'role', 'created_at'),
+}
+
+# Таблицы без зависимостей можно грузить параллельно, таблицы связей - только после них
+PARENT_TABLES = ('genre', 'person', 'film_work')
+LINK_TABLES = ('genre_film_work', 'person_film_work')
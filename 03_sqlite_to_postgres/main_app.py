@@ -1,20 +1,68 @@
-from sqlite_manager import SqliteMenedger
-from psql_manager import PostgreMenedger
+import argparse
 
+from metrics import MigrationMetrics
+from migrator import Migrator
+from psql_manager import LOAD_MODES
+from state import MigrationState
 
-if __name__ == '__main__':
-
-    sqlite = SqliteMenedger()
-    postgre = PostgreMenedger('content')
 
-    for table_name in postgre.sql_command.keys():
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Перенос данных из sqlite в postgres')
+    parser.add_argument('--mode', choices=LOAD_MODES, default='upsert',
+                        help='Способ записи в postgres: insert, upsert или copy (COPY + set-based upsert)')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='Количество строк в пачке при чтении из sqlite')
+    parser.add_argument('--workers', type=int, default=3,
+                        help='Сколько таблиц переносится одновременно')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Сколько процессов переносят диапазоны rowid больших таблиц; 1 - без процессов')
+    parser.add_argument('--queue-size', type=int, default=10,
+                        help='Сколько пачек может ждать записи в postgres для одной таблицы')
+    parser.add_argument('--pool-size', type=int, default=5,
+                        help='Максимальное число соединений с postgres')
+    parser.add_argument('--commit-size', type=int, default=5000,
+                        help='Сколько строк записывается в postgres одной транзакцией')
+    parser.add_argument('--resume', action='store_true',
+                        help='Продолжить прерванный перенос с последней контрольной точки')
+    parser.add_argument('--state-file', default='03_sqlite_to_postgres/migration_state.json',
+                        help='Файл с прогрессом переноса по таблицам')
+    parser.add_argument('--delta', action='store_true',
+                        help='Перенести только строки, изменившиеся после предыдущего запуска')
+    parser.add_argument('--sqlite-path', default='03_sqlite_to_postgres/db.sqlite',
+                        help='Путь к исходной базе sqlite')
+    parser.add_argument('--read-only', action='store_true',
+                        help='Открыть sqlite только на чтение (mode=ro&immutable=1), '
+                             'файл не должен меняться во время переноса')
+    parser.add_argument('--stats-json',
+                        help='Куда записать итоговую статистику по таблицам в формате json')
+    return parser.parse_args()
 
-        while True:
-            rows_pack = sqlite.fetch_data(table_name)
 
-            if not rows_pack:
-                break
+if __name__ == '__main__':
 
-            postgre.insert_data(table_name, rows_pack)
+    args = parse_args()
 
-        sqlite.offset = 0
+    metrics = MigrationMetrics()
+    migrator = Migrator(
+        'content',
+        mode=args.mode,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        pool_size=args.pool_size,
+        commit_size=args.commit_size,
+        state=MigrationState(args.state_file),
+        resume=args.resume,
+        delta=args.delta,
+        sqlite_path=args.sqlite_path,
+        metrics=metrics,
+        processes=args.processes,
+        read_only=args.read_only,
+    )
+    try:
+        migrator.run()
+    finally:
+        migrator.close()
+        metrics.print_summary()
+        if args.stats_json:
+            metrics.write_json(args.stats_json)
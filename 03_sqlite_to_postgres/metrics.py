@@ -0,0 +1,136 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Iterator, TextIO
+
+
+STAGES = ('extract', 'transform', 'load')
+
+
+@dataclass
+class TableStats:
+    rows_total: int = 0
+    rows_done: int = 0
+    started: float = None
+    finished: float = None
+    stages: dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+
+    @property
+    def seconds(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_done / self.seconds if self.seconds else 0.0
+
+
+class MigrationMetrics:
+    """Время стадий extract/transform/load и прогресс по таблицам.
+
+    Стадии разных таблиц и чтение с записью одной таблицы идут в разных потоках,
+    поэтому их время суммируется по каждой стадии отдельно и может перекрываться.
+    Строка прогресса выводится в stream не чаще раза в interval секунд."""
+
+    def __init__(self, stream: TextIO = sys.stderr, interval: float = 1.0) -> None:
+        self.stream = stream
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.tables: dict[str, TableStats] = {}
+        self.started = time.monotonic()
+        self.last_report = 0.0
+
+    def register_table(self, table_name: str, rows_total: int) -> None:
+        with self.lock:
+            self.tables[table_name] = TableStats(rows_total=rows_total)
+
+    def start_table(self, table_name: str) -> None:
+        with self.lock:
+            self.tables[table_name].started = time.monotonic()
+
+    def finish_table(self, table_name: str) -> None:
+        with self.lock:
+            self.tables[table_name].finished = time.monotonic()
+        self.report_progress(force=True)
+
+    @contextmanager
+    def stage(self, table_name: str, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(table_name, stage, time.perf_counter() - started)
+
+    def add_stage_time(self, table_name: str, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.tables[table_name].stages[stage] += seconds
+
+    def add_rows(self, table_name: str, rows: int) -> None:
+        with self.lock:
+            self.tables[table_name].rows_done += rows
+        self.report_progress()
+
+    def progress_line(self) -> str:
+        with self.lock:
+            tables = list(self.tables.items())
+        rows_done = sum(stats.rows_done for _, stats in tables)
+        rows_left = sum(max(stats.rows_total - stats.rows_done, 0) for _, stats in tables if stats.finished is None)
+        elapsed = time.monotonic() - self.started
+        rate = rows_done / elapsed if elapsed else 0.0
+        eta = str(timedelta(seconds=round(rows_left / rate))) if rate else '?'
+
+        parts = [
+            f'{table_name} {stats.rows_done}/{stats.rows_total}' + (' done' if stats.finished else '')
+            for table_name, stats in tables
+        ]
+        return f"[{', '.join(parts)}] {rate:.0f} rows/s ETA {eta}"
+
+    def report_progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        line = self.progress_line()
+        if self.stream.isatty():
+            self.stream.write(f'\r\033[K{line}')
+        else:
+            self.stream.write(f'{line}\n')
+        self.stream.flush()
+
+    def summary(self) -> dict:
+        with self.lock:
+            tables = {
+                table_name: {
+                    'rows_total': stats.rows_total,
+                    'rows_done': stats.rows_done,
+                    'seconds': round(stats.seconds, 3),
+                    'rows_per_second': round(stats.rows_per_second, 1),
+                    'stages': {stage: round(seconds, 3) for stage, seconds in stats.stages.items()},
+                }
+                for table_name, stats in self.tables.items()
+            }
+        return {
+            'seconds': round(time.monotonic() - self.started, 3),
+            'rows_done': sum(table['rows_done'] for table in tables.values()),
+            'tables': tables,
+        }
+
+    def print_summary(self) -> None:
+        if self.stream.isatty():
+            self.stream.write('\n')
+        summary = self.summary()
+        for table_name, table in summary['tables'].items():
+            stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in table['stages'].items())
+            self.stream.write(f"{table_name}: {table['rows_done']} rows in {table['seconds']:.2f}s "
+                              f"({table['rows_per_second']:.0f} rows/s; {stages})\n")
+        self.stream.write(f"total: {summary['rows_done']} rows in {summary['seconds']:.2f}s\n")
+        self.stream.flush()
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as stats_file:
+            json.dump(self.summary(), stats_file, indent=2)
@@ -0,0 +1,305 @@
+import io
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import chain
+from typing import Iterator
+
+import psycopg2
+import psycopg2.extensions
+
+from data_classes import COLUMNS, LINK_TABLES, PARENT_TABLES, Row
+from metrics import MigrationMetrics
+from psql_manager import PostgreMenedger
+from sqlite_manager import DELTA_COLUMNS, SqliteMenedger
+from state import MigrationState
+
+
+STOP = object()
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Диапазон rowid (after_rowid, until_rowid] таблицы, который переносит отдельный процесс"""
+    table_name: str
+    after_rowid: int
+    until_rowid: int
+
+    @property
+    def name(self) -> str:
+        return f'{self.table_name}[{self.after_rowid}:{self.until_rowid}]'
+
+
+def migrate_shard(shard: Shard, options: dict, high_water_mark: str = None) -> dict:
+    """Переносит один диапазон в дочернем процессе: своё read-only соединение с sqlite,
+    своё соединение с postgres и тот же конвейер чтения и записи, что у целой таблицы.
+
+    Контрольные точки внутри диапазона не сохраняются, после падения диапазон переносится заново"""
+    metrics = MigrationMetrics(stream=io.StringIO())
+    metrics.register_table(shard.table_name, 0)
+    state = MigrationState(path=None)
+    state.save_checkpoint(shard.table_name, shard.after_rowid)
+    if high_water_mark is not None:
+        state.save_high_water_mark(shard.table_name, high_water_mark)
+
+    migrator = Migrator(**options, workers=1, pool_size=1, read_only=True, state=state, metrics=metrics)
+    try:
+        high_water_mark = migrator.transfer(shard.table_name, until_rowid=shard.until_rowid)
+    finally:
+        migrator.close()
+
+    stats = metrics.tables[shard.table_name]
+    return {'rows': stats.rows_done, 'stages': stats.stages, 'high_water_mark': high_water_mark}
+
+
+class Migrator:
+    """Конвейерный перенос данных из sqlite в postgres.
+
+    Для каждой таблицы поток-читатель кладёт пачки из sqlite в ограниченную очередь,
+    а поток-писатель забирает их и пишет в postgres, так что чтение и запись идут одновременно.
+    Независимые таблицы обрабатываются параллельно в пуле из workers потоков.
+    Транзакция в postgres фиксируется после каждых commit_size строк, и после неё
+    в state сохраняется контрольная точка, с которой можно продолжить перенос (resume=True).
+    В режиме delta=True переносятся только строки, изменившиеся после предыдущего запуска.
+
+    С processes > 1 большие таблицы делятся на диапазоны rowid, и каждый диапазон
+    переносится в отдельном процессе (migrate_shard), так что чтение sqlite и подготовка
+    строк не упираются в одно ядро. Контрольные точки в этом режиме - готовые диапазоны."""
+
+    def __init__(self, schema: str = 'content', mode: str = 'upsert', batch_size: int = 500,
+                 workers: int = 3, queue_size: int = 10, pool_size: int = 5, commit_size: int = 5000,
+                 retries: int = 3, state: MigrationState = None, resume: bool = False,
+                 delta: bool = False, sqlite_path: str = "03_sqlite_to_postgres/db.sqlite",
+                 metrics: MigrationMetrics = None, processes: int = 1, read_only: bool = False,
+                 postgre: PostgreMenedger = None) -> None:
+        self.postgre = postgre or PostgreMenedger(schema, mode=mode, pool_size=pool_size)
+        self.schema = schema
+        self.mode = mode
+        self.sqlite_path = sqlite_path
+        self.read_only = read_only
+        self.batch_size = batch_size
+        self.workers = workers
+        self.queue_size = queue_size
+        self.commit_size = commit_size
+        self.retries = retries
+        self.state = state or MigrationState()
+        self.resume = resume
+        self.delta = delta
+        self.metrics = metrics or MigrationMetrics()
+        self.processes = processes
+        self.process_pool = None
+
+    def close(self) -> None:
+        self.postgre.close()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(cancel_futures=True)
+
+    def run(self) -> None:
+        """Переносит все таблицы: сначала PARENT_TABLES, затем LINK_TABLES, и пересчитывает film_work_full"""
+        if self.resume:
+            self.state.load()
+        else:
+            self.state.reset()
+
+        sqlite = SqliteMenedger(path=self.sqlite_path)
+        for table_name in PARENT_TABLES + LINK_TABLES:
+            self.metrics.register_table(table_name, sqlite.get_count_rows(table_name))
+        sqlite.db.close()
+
+        if self.processes > 1 and self.process_pool is None:
+            # spawn, а не fork: у родителя уже есть потоки и соединения, которые нельзя копировать в потомка
+            self.process_pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='migrator') as pool:
+            for stage in (PARENT_TABLES, LINK_TABLES):
+                futures = [pool.submit(self.migrate_table, table_name) for table_name in stage]
+                for future in futures:
+                    future.result()
+
+        # Сводную таблицу фильмов пересчитываем, когда перенесены и фильмы, и все их связи
+        self.postgre.refresh_film_work_full()
+
+    def migrate_table(self, table_name: str) -> None:
+        """Переносит одну таблицу целиком или по диапазонам в дочерних процессах"""
+        self.metrics.start_table(table_name)
+        if self.state.is_done(table_name):
+            self.metrics.finish_table(table_name)
+            return
+
+        if self.process_pool is not None:
+            high_water_mark = self.migrate_shards(table_name)
+        else:
+            high_water_mark = self.transfer(table_name)
+
+        # Граница сдвигается только после переноса всей таблицы: строки идут в порядке rowid, а не даты
+        if high_water_mark is not None:
+            self.state.save_high_water_mark(table_name, high_water_mark)
+        self.state.mark_done(table_name)
+        self.metrics.finish_table(table_name)
+
+    def shards(self, table_name: str) -> list[Shard]:
+        """Диапазоны rowid таблицы: не больше processes и не меньше commit_size строк в каждом"""
+        rows_total = self.metrics.tables[table_name].rows_total
+        count = max(1, min(self.processes, rows_total // self.commit_size))
+        sqlite = SqliteMenedger(path=self.sqlite_path, read_only=True)
+        try:
+            ranges = sqlite.rowid_ranges(table_name, count)
+        finally:
+            sqlite.db.close()
+        return [Shard(table_name, after_rowid, until_rowid) for after_rowid, until_rowid in ranges]
+
+    def migrate_shards(self, table_name: str) -> str:
+        """Раздаёт ещё не перенесённые диапазоны таблицы пулу процессов и собирает их статистику.
+
+        Ключи конфликта у строк разных диапазонов разные (id или уникальная пара в таблице связей),
+        поэтому параллельные upsert не обновляют одну запись и дают тот же результат, что и
+        последовательный перенос. Если ключ всё же повторяется, взаимоблокировки повторяются
+        в commit_batch, а побеждает диапазон, зафиксированный последним"""
+        options = {
+            'schema': self.schema,
+            'mode': self.mode,
+            'batch_size': self.batch_size,
+            'queue_size': self.queue_size,
+            'commit_size': self.commit_size,
+            'retries': self.retries,
+            'delta': self.delta,
+            'sqlite_path': self.sqlite_path,
+        }
+        high_water_mark = self.state.high_water_mark(table_name)
+        changed_since = high_water_mark if self.delta else None
+
+        futures = {
+            self.process_pool.submit(migrate_shard, shard, options, changed_since): shard
+            for shard in self.shards(table_name) if not self.state.is_done(shard.name)
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            for stage, seconds in result['stages'].items():
+                self.metrics.add_stage_time(table_name, stage, seconds)
+            self.metrics.add_rows(table_name, result['rows'])
+            self.state.mark_done(futures[future].name)
+
+            if result['high_water_mark'] is not None and (high_water_mark is None
+                                                          or result['high_water_mark'] > high_water_mark):
+                high_water_mark = result['high_water_mark']
+        return high_water_mark
+
+    def transfer(self, table_name: str, until_rowid: int = None) -> str:
+        """Переносит строки таблицы после контрольной точки, читая sqlite в отдельном потоке
+
+        Returns:
+            str: Наибольшее значение колонки из DELTA_COLUMNS среди перенесённых строк
+        """
+        packs = queue.Queue(maxsize=self.queue_size)
+        stopped = threading.Event()
+        errors = []
+
+        producer = threading.Thread(
+            target=self.produce, args=(table_name, packs, stopped, errors, until_rowid),
+            name=f'reader-{table_name}', daemon=True,
+        )
+        producer.start()
+
+        try:
+            high_water_mark = self.consume(table_name, self.iter_queue(packs))
+        finally:
+            stopped.set()
+            producer.join()
+
+        if errors:
+            raise errors[0]
+        return high_water_mark
+
+    def produce(self, table_name: str, packs: queue.Queue, stopped: threading.Event, errors: list,
+                until_rowid: int = None) -> None:
+        """Читает таблицу из sqlite и кладёт пачки в очередь, пока писатель не остановился.
+
+        Соединение sqlite создаётся здесь, потому что его нельзя использовать из другого потока"""
+        try:
+            sqlite = SqliteMenedger(batch_size=self.batch_size, path=self.sqlite_path, read_only=self.read_only)
+            after_rowid = self.state.last_rowid(table_name)
+            changed_since = self.state.high_water_mark(table_name) if self.delta else None
+            rows_packs = sqlite.iter_rows(table_name, after_rowid=after_rowid, changed_since=changed_since,
+                                          until_rowid=until_rowid)
+            while True:
+                with self.metrics.stage(table_name, 'extract'):
+                    item = next(rows_packs, None)
+                if item is None or not self.put(packs, item, stopped):
+                    return
+        except Exception as error:
+            errors.append(error)
+        finally:
+            self.put(packs, STOP, stopped)
+
+    @staticmethod
+    def put(packs: queue.Queue, item, stopped: threading.Event) -> bool:
+        """Кладёт item в очередь, не блокируясь навсегда, если писатель упал"""
+        while not stopped.is_set():
+            try:
+                packs.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def iter_queue(packs: queue.Queue) -> Iterator[tuple[int, list[Row]]]:
+        return iter(packs.get, STOP)
+
+    def consume(self, table_name: str, packs: Iterator[tuple[int, list[Row]]]) -> str:
+        """Копит пачки до commit_size строк и записывает их в postgres одной транзакцией.
+
+        Returns:
+            str: Наибольшее значение колонки из DELTA_COLUMNS среди перенесённых строк
+        """
+        pending, pending_rows = [], 0
+        last_rowid = None
+        high_water_mark = self.state.high_water_mark(table_name)
+        delta_index = COLUMNS[table_name].index(DELTA_COLUMNS[table_name])
+
+        for last_rowid, rows_pack in packs:
+            pending.append(rows_pack)
+            pending_rows += len(rows_pack)
+
+            pack_max = max(row[delta_index] or '' for row in rows_pack)
+            if high_water_mark is None or pack_max > high_water_mark:
+                high_water_mark = pack_max
+
+            if pending_rows >= self.commit_size:
+                self.commit_batch(table_name, pending, last_rowid)
+                pending, pending_rows = [], 0
+
+        if pending:
+            self.commit_batch(table_name, pending, last_rowid)
+
+        return high_water_mark
+
+    def commit_batch(self, table_name: str, pending: list[list[Row]], last_rowid: int) -> None:
+        """Записывает накопленные пачки, фиксирует транзакцию и сохраняет контрольную точку.
+
+        Если соединение оборвалось, пул выбрасывает его, и пачки записываются заново
+        через новое соединение - до фиксации в postgres от них ничего не остаётся.
+        После взаимоблокировки с параллельным писателем запись повторяется через случайную паузу"""
+        with self.metrics.stage(table_name, 'transform'):
+            rows = list(self.postgre.to_rows(table_name, chain.from_iterable(pending)))
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self.metrics.stage(table_name, 'load'), self.postgre.connection() as conn:
+                    self.postgre.insert_data(table_name, rows, conn)
+                    conn.commit()
+                break
+            except psycopg2.extensions.TransactionRollbackError:
+                if attempt == self.retries:
+                    raise
+                time.sleep(random.uniform(0, 0.1 * (attempt + 1)))
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if attempt == self.retries:
+                    raise
+
+        self.state.save_checkpoint(table_name, last_rowid)
+        self.metrics.add_rows(table_name, len(rows))
@@ -1,27 +1,84 @@
-from dataclasses import asdict
-from typing import Union
+import threading
+from contextlib import contextmanager
+from operator import attrgetter
+from typing import Iterable, Iterator, Union
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 from dotenv import dotenv_values
 
-from data_classes import (Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork)
+from data_classes import (COLUMNS, DataClass, Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork, Row)
+
+
+LOAD_MODES = ('insert', 'upsert', 'copy')
+
+
+class CopyStream:
+    """Файлоподобный объект для COPY FROM STDIN, который читает строки из генератора
+    по мере запроса, не собирая всю таблицу в памяти"""
+
+    def __init__(self, lines: Iterator[str]) -> None:
+        self.lines = lines
+        self.buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.lines)
+            except StopIteration:
+                break
+
+        if size < 0:
+            chunk, self.buffer = self.buffer, ''
+        else:
+            chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def copy_value(value) -> str:
+    """Приводит значение к текстовому формату COPY: NULL как \\N, спецсимволы экранируются"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
 
 
 class PostgreMenedger:
 
-    def __init__(self, schema) -> None:
+    def __init__(self, schema, mode: str = 'upsert', pool_size: int = 5) -> None:
+
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Неизвестный режим загрузки {mode}, доступны: {', '.join(LOAD_MODES)}")
 
         self.schema = schema
 
+        self.mode = mode
+
         self.dsn = dotenv_values("03_sqlite_to_postgres/.env")
 
         self.offset = 0
 
+        # Пул держит не больше minconn свободных соединений, а лишние при возврате закрывает:
+        # minconn=pool_size открывает все соединения сразу, и они переиспользуются между пачками
+        self.pool = psycopg2.pool.ThreadedConnectionPool(pool_size, pool_size, **self.dsn)
+        # ThreadedConnectionPool бросает PoolError при исчерпании, семафор заставляет ждать свободное соединение
+        self.pool_slots = threading.BoundedSemaphore(pool_size)
+
+        self.columns = COLUMNS
+
+        self.conflict_keys = {
+            "genre": ('id',),
+            "film_work": ('id',),
+            "genre_film_work": ('id',),
+            "person": ('id',),
+            "person_film_work": ('film_work_id', 'person_id'),
+        }
+
         self.sql_command = {
                 "genre": f"""
                             INSERT INTO {self.schema}.genre (id, name, description, created_at, updated_at)
-                            VALUES (%(id)s, %(name)s, %(description)s, %(created_at)s, %(updated_at)s)
+                            VALUES (%s, %s, %s, %s, %s)
                             ON CONFLICT (id)
                             DO UPDATE SET name=EXCLUDED.name, description=EXCLUDED.description,
                                 created_at=EXCLUDED.created_at, updated_at=EXCLUDED.updated_at
@@ -30,8 +87,8 @@ class PostgreMenedger:
                 "film_work": f"""
                             INSERT INTO {self.schema}.film_work (id, title, description, creation_date,
                                 file_path, rating, type, created_at, updated_at)
-                            VALUES (%(id)s, %(title)s, %(description)s, %(creation_date)s,
-                            %(file_path)s, %(rating)s, %(type)s, %(created_at)s, %(updated_at)s)
+                            VALUES (%s, %s, %s, %s,
+                            %s, %s, %s, %s, %s)
                             ON CONFLICT (id)
                             DO UPDATE SET title=EXCLUDED.title, description=EXCLUDED.description,
                                 creation_date=EXCLUDED.creation_date, file_path=EXCLUDED.file_path,
@@ -41,7 +98,7 @@ class PostgreMenedger:
 
                 "genre_film_work": f"""
                             INSERT INTO {self.schema}.genre_film_work (id, film_work_id, genre_id, created_at)
-                            VALUES (%(id)s, %(film_work_id)s, %(genre_id)s, %(created_at)s)
+                            VALUES (%s, %s, %s, %s)
                             ON CONFLICT (id)
                             DO UPDATE SET film_work_id=EXCLUDED.film_work_id, genre_id=EXCLUDED.genre_id,
                                 created_at=EXCLUDED.created_at
@@ -49,7 +106,7 @@ class PostgreMenedger:
 
                 "person": f"""
                             INSERT INTO {self.schema}.person (id, full_name, created_at, updated_at)
-                            VALUES (%(id)s, %(full_name)s,%(created_at)s, %(updated_at)s)
+                            VALUES (%s, %s,%s, %s)
                             ON CONFLICT (id)
                             DO UPDATE SET full_name=EXCLUDED.full_name,
                                 created_at=EXCLUDED.created_at, updated_at=EXCLUDED.updated_at
@@ -58,20 +115,144 @@ class PostgreMenedger:
                 "person_film_work": f"""
                             INSERT INTO {self.schema}.person_film_work (id, film_work_id,
                                 person_id, role, created_at)
-                            VALUES (%(id)s, %(film_work_id)s, %(person_id)s, %(role)s, %(created_at)s)
+                            VALUES (%s, %s, %s, %s, %s)
                             ON CONFLICT (film_work_id, person_id)
                             DO UPDATE SET film_work_id=EXCLUDED.film_work_id, person_id=EXCLUDED.person_id,
-                                role=EXCLUDED.role, created_at=EXCLUDED.created_at 
+                                role=EXCLUDED.role, created_at=EXCLUDED.created_at
                             """}
 
-    def insert_data(self, table_name: str, data_pack: Union[list[Genre], list[Filmwork], list[GenreFilmwork],
-                                                            list[Person], list[PersonFilmwork]]) -> None:
-        """Получает на вход лист обьектов датакласов Filmwork, Genre, Genre_film_work,
-        Person, Person_film_work и загружает их в базу данных postgres"""
-        with psycopg2.connect(**self.dsn) as conn, conn.cursor() as cursor:
-            for data in data_pack:
-                cursor.execute(self.sql_command[table_name], asdict(data))
-                
+    def insert_command(self, table_name: str) -> str:
+        """Возвращает простой INSERT без обработки конфликтов для таблицы table_name"""
+        columns = self.columns[table_name]
+        return f"""
+                INSERT INTO {self.schema}.{table_name} ({', '.join(columns)})
+                VALUES ({', '.join('%s' for _ in columns)})
+                """
+
+    def merge_command(self, table_name: str, staging_table: str) -> str:
+        """Возвращает set-based upsert из staging-таблицы в {schema}.{table_name}.
+
+        DISTINCT ON оставляет для каждого ключа конфликта последнюю загруженную строку,
+        иначе один INSERT ... ON CONFLICT попытается обновить одну запись дважды"""
+        columns = ', '.join(self.columns[table_name])
+        keys = ', '.join(self.conflict_keys[table_name])
+        updates = ', '.join(f'{column}=EXCLUDED.{column}' for column in self.columns[table_name] if column != 'id')
+        return f"""
+                INSERT INTO {self.schema}.{table_name} ({columns})
+                SELECT DISTINCT ON ({keys}) {columns} FROM {staging_table}
+                ORDER BY {keys}, load_order DESC
+                ON CONFLICT ({keys})
+                DO UPDATE SET {updates}
+                """
+
+    def __enter__(self) -> 'PostgreMenedger':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Закрывает все соединения пула"""
+        if not self.pool.closed:
+            self.pool.closeall()
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """Выдаёт соединение из пула и возвращает его обратно.
+
+        Закрытое соединение заменяется новым. Если во время работы соединение оборвалось,
+        оно выбрасывается из пула, и следующий вызов откроет новое. Фиксировать транзакцию
+        должен вызывающий код, незафиксированные изменения откатываются."""
+        with self.pool_slots:
+            conn = self.pool.getconn()
+            if conn.closed:
+                self.pool.putconn(conn, close=True)
+                conn = self.pool.getconn()
+
+            try:
+                yield conn
+            except psycopg2.extensions.TransactionRollbackError:
+                # Взаимоблокировка или конфликт сериализации: транзакция откатилась, а соединение исправно
+                conn.rollback()
+                self.pool.putconn(conn)
+                raise
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                self.pool.putconn(conn, close=True)
+                raise
+            except Exception:
+                conn.rollback()
+                self.pool.putconn(conn)
+                raise
+            else:
+                conn.rollback()
+                self.pool.putconn(conn)
+
+    @staticmethod
+    def to_rows(table_name: str, data_pack: Iterable[Union[DataClass, Row]]) -> Iterator[Row]:
+        """Приводит обьекты датакласов к кортежам в порядке COLUMNS, кортежи отдаёт как есть"""
+        get_values = attrgetter(*COLUMNS[table_name])
+        for data in data_pack:
+            yield data if isinstance(data, tuple) else get_values(data)
+
+    def insert_data(self, table_name: str, data_pack: Iterable[Union[DataClass, Row]],
+                    conn: psycopg2.extensions.connection = None) -> None:
+        """Получает на вход обьекты датакласов Filmwork, Genre, Genre_film_work,
+        Person, Person_film_work или кортежи значений в порядке self.columns
+        и загружает их в базу данных postgres.
+
+        Способ записи зависит от self.mode:
+            insert - простой INSERT, дубликаты приводят к ошибке;
+            upsert - INSERT ... ON CONFLICT DO UPDATE из sql_command;
+            copy - поток COPY FROM STDIN во временную таблицу и один upsert в {schema}.{table_name}.
+                   В этом режиме data_pack может быть генератором по всей таблице.
+
+        Если передан conn, запись идёт в его транзакцию и фиксирует её вызывающий код,
+        иначе соединение берётся из пула и транзакция фиксируется сразу."""
+        if conn is None:
+            with self.connection() as conn:
+                self.insert_data(table_name, data_pack, conn)
+                conn.commit()
+            return
+
+        with conn.cursor() as cursor:
+            if self.mode == 'copy':
+                self.copy_data(cursor, table_name, data_pack)
+                return
+
+            command = self.insert_command(table_name) if self.mode == 'insert' else self.sql_command[table_name]
+            psycopg2.extras.execute_batch(cursor, command, self.to_rows(table_name, data_pack))
+
+    def copy_data(self, cursor, table_name: str, data_pack: Iterable[Union[DataClass, Row]]) -> None:
+        """Стримит data_pack через COPY во временную таблицу и сливает её в {schema}.{table_name}"""
+        columns = self.columns[table_name]
+        staging_table = f'staging_{table_name}'
+
+        cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        cursor.execute(f"""
+                CREATE TEMP TABLE {staging_table}
+                (LIKE {self.schema}.{table_name} INCLUDING DEFAULTS) ON COMMIT DROP
+                """)
+        cursor.execute(f"ALTER TABLE {staging_table} ADD COLUMN load_order BIGSERIAL")
+
+        lines = (
+            '\t'.join(map(copy_value, row)) + '\n'
+            for row in self.to_rows(table_name, data_pack)
+        )
+        cursor.copy_expert(
+            f"COPY {staging_table} ({', '.join(columns)}) FROM STDIN",
+            CopyStream(lines),
+        )
+        cursor.execute(self.merge_command(table_name, staging_table))
+
+    def refresh_film_work_full(self) -> None:
+        """Пересчитывает {schema}.film_work_full, из которой читают API и выгрузка каталога.
+
+        Загрузчик пишет фильмы и связи напрямую, мимо сигналов Django, поэтому после переноса
+        сводная таблица пересобирается целиком одним вызовом"""
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"SELECT {self.schema}.refresh_film_work_full(NULL)")
+            conn.commit()
+
     def get_rows_count(self, table_name: str) -> int:
         """Получает на вход имя таблицы и возварщает количество строк в ней
 
@@ -82,7 +263,7 @@ class PostgreMenedger:
             int: Количество строк
         """
 
-        with psycopg2.connect(**self.dsn) as conn, conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+        with self.connection() as conn, conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
             cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
             rows_count = cursor.fetchone()
             return rows_count[0]
@@ -91,7 +272,7 @@ class PostgreMenedger:
                                                    list[Person], list[PersonFilmwork]]:
         """Получает на вход имя таблицы база psql и возвращает лист
         обьектов датакласов Film_work, Genre, Genre_film_work, Person, Person_film_work"""
-        with psycopg2.connect(**self.dsn) as conn, conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+        with self.connection() as conn, conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
             cursor.execute(f"SELECT * FROM {table_name} LIMIT 10 OFFSET {self.offset}")
             rows_pack = cursor.fetchmany(10)
 
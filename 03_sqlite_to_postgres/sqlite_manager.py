@@ -1,26 +1,55 @@
 import sqlite3
-from data_classes import (Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork)
-from typing import Union
+from dataclasses import fields
+from data_classes import (COLUMNS, DataClass, Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork, Row)
+from operator import itemgetter
+from typing import Iterator, Union
 
 
+# Колонки, по которым в режиме дельты отбираются изменившиеся строки
+DELTA_COLUMNS = {
+    "genre": "updated_at",
+    "film_work": "updated_at",
+    "person": "updated_at",
+    "genre_film_work": "created_at",
+    "person_film_work": "created_at",
+}
 
-class SqliteMenedger:
 
-    def __init__(self):
+# Чтение таблиц целиком идёт последовательно: файл отображается в память, а не читается
+# через read() в кеш страниц sqlite; временные структуры сортировок держатся в памяти
+MMAP_SIZE = 1 << 30
+CACHE_SIZE_KIB = 64 * 1024
+
 
-        self.db = sqlite3.connect("03_sqlite_to_postgres/db.sqlite")
+DATA_CLASSES = {
+    "genre": Genre,
+    "film_work": Filmwork,
+    "genre_film_work": GenreFilmwork,
+    "person": Person,
+    "person_film_work": PersonFilmwork,
+}
 
-        def dict_factory(cursor, row):
 
-            d = {}
+class SqliteMenedger:
 
-            for idx, col in enumerate(cursor.description):
-                d[col[0]] = row[idx]
+    def __init__(self, batch_size: int = 10, path: str = "03_sqlite_to_postgres/db.sqlite", read_only: bool = False,
+                 mmap_size: int = MMAP_SIZE, cache_size_kib: int = CACHE_SIZE_KIB):
 
-            return d
+        if read_only:
+            # immutable=1: sqlite не берёт блокировки и не проверяет изменения файла,
+            # так файл читают сразу несколько процессов; пока идёт перенос, источник менять нельзя
+            self.db = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+        else:
+            self.db = sqlite3.connect(path)
 
-        self.db.row_factory = dict_factory
+        self.db.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        self.db.execute(f"PRAGMA cache_size = {-int(cache_size_kib)}")
+        self.db.execute("PRAGMA temp_store = MEMORY")
+
+        # sqlite3.Row собирается в C и даёт доступ к колонкам по имени без словаря на каждую строку
+        self.db.row_factory = sqlite3.Row
         self.offset = 0
+        self.batch_size = batch_size
 
     def get_count_rows(self, table_name: str) -> int:
         """Получает на вход имя таблицы и возваршает количетво строк в ней
@@ -37,16 +66,9 @@ class SqliteMenedger:
         self.cur.close()
         return row_count['COUNT(id)']
 
-    def fetch_data(self, table_name: str) -> Union[list[Genre], list[Filmwork], list[GenreFilmwork],
-                                                   list[Person], list[PersonFilmwork]]:
-        """Получает на вход имя таблицы база sqlite и возвращает лист
-        обьектов датакласов Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork"""
-
-        self.cur = self.db.cursor()
-        self.cur.execute(f"SELECT * FROM {table_name} LIMIT 10 OFFSET {self.offset}")
-        rows_pack = self.cur.fetchmany(10)
-        self.cur.close()
-
+    @staticmethod
+    def to_data_classes(table_name: str, rows_pack: list[dict]) -> list[DataClass]:
+        """Превращает строки таблицы table_name в обьекты соответствующего датакласа"""
         match table_name:
             case "genre":
                 data_pack = [
@@ -69,5 +91,93 @@ class SqliteMenedger:
                     (PersonFilmwork(**row)) for row in rows_pack
                 ]
 
+        return data_pack
+
+    def fetch_data(self, table_name: str) -> Union[list[Genre], list[Filmwork], list[GenreFilmwork],
+                                                   list[Person], list[PersonFilmwork]]:
+        """Получает на вход имя таблицы база sqlite и возвращает лист
+        обьектов датакласов Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork"""
+
+        self.cur = self.db.cursor()
+        self.cur.execute(f"SELECT * FROM {table_name} LIMIT 10 OFFSET {self.offset}")
+        rows_pack = self.cur.fetchmany(10)
+        self.cur.close()
+
+        data_pack = self.to_data_classes(table_name, rows_pack)
+
         self.offset += 10
         return data_pack
+
+    def rowid_ranges(self, table_name: str, shards: int) -> list[tuple[int, int]]:
+        """Делит таблицу на shards диапазонов rowid равной ширины.
+
+        Returns:
+            list[tuple[int, int]]: Пары (after_rowid, until_rowid) для iter_rows, пустой список для пустой таблицы
+        """
+        cursor = self.db.cursor()
+        cursor.row_factory = None
+        try:
+            first, last = cursor.execute(f"SELECT min(rowid), max(rowid) FROM {table_name}").fetchone()
+        finally:
+            cursor.close()
+        if first is None:
+            return []
+
+        step = -(-(last - first + 1) // shards)
+        return [
+            (after_rowid, min(after_rowid + step, last))
+            for after_rowid in range(first - 1, last, step)
+        ]
+
+    def iter_rows(self, table_name: str, batch_size: int = None, after_rowid: int = 0,
+                  changed_since: str = None, until_rowid: int = None) -> Iterator[tuple[int, list[Row]]]:
+        """То же, что iter_data, но отдаёт строки кортежами в порядке COLUMNS[table_name].
+
+        Кортеж из курсора sqlite сразу годится как параметры запроса в postgres,
+        без промежуточных словаря и датакласса. until_rowid ограничивает чтение
+        диапазоном rowid (after_rowid, until_rowid]"""
+        batch_size = batch_size or self.batch_size
+
+        query = f"SELECT rowid, {', '.join(COLUMNS[table_name])} FROM {table_name} WHERE rowid > ?"
+        params = [after_rowid]
+        if until_rowid is not None:
+            query += " AND rowid <= ?"
+            params.append(until_rowid)
+        if changed_since is not None:
+            query += f" AND {DELTA_COLUMNS[table_name]} > ?"
+            params.append(changed_since)
+
+        cursor = self.db.cursor()
+        cursor.row_factory = None
+        try:
+            cursor.execute(f"{query} ORDER BY rowid", params)
+            while rows_pack := cursor.fetchmany(batch_size):
+                yield rows_pack[-1][0], [row[1:] for row in rows_pack]
+        finally:
+            cursor.close()
+
+    def iter_data(self, table_name: str, batch_size: int = None, after_rowid: int = 0,
+                  changed_since: str = None) -> Iterator[tuple[int, list[DataClass]]]:
+        """Читает таблицу одним курсором в порядке rowid и отдаёт пачки датаклассов.
+
+        В отличие от fetch_data не перезапускает запрос с OFFSET на каждую пачку,
+        поэтому чтение всей таблицы линейно, а в памяти держится не больше одной пачки.
+
+        Args:
+            table_name (str): Имя таблицы
+            batch_size (int): Размер пачки, по умолчанию self.batch_size
+            after_rowid (int): Начать со строки, следующей за этим rowid
+            changed_since (str): Отдавать только строки, у которых колонка из DELTA_COLUMNS больше этого значения
+
+        Yields:
+            tuple[int, list]: rowid последней строки пачки и сама пачка
+        """
+        batch_size = batch_size or self.batch_size
+
+        data_class = DATA_CLASSES[table_name]
+        # Позиции полей датакласса в кортеже строки считаются один раз на таблицу
+        columns = COLUMNS[table_name]
+        get_fields = itemgetter(*(columns.index(data_field.name) for data_field in fields(data_class)))
+
+        for last_rowid, rows_pack in self.iter_rows(table_name, batch_size, after_rowid, changed_since):
+            yield last_rowid, [data_class(*get_fields(row)) for row in rows_pack]
@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+
+
+class MigrationState:
+    """Прогресс переноса по таблицам, сохраняемый в json-файл.
+
+    После каждой зафиксированной в postgres транзакции записывается rowid последней
+    перенесённой строки, поэтому после падения перенос можно продолжить с этого места.
+    Для режима дельты здесь же хранится верхняя граница updated_at/created_at
+    уже перенесённых строк каждой таблицы, она переживает reset.
+    Файл перезаписывается атомарно через os.replace."""
+
+    def __init__(self, path: str = "03_sqlite_to_postgres/migration_state.json") -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.high_water_marks = {}
+
+    def load(self) -> None:
+        """Читает сохранённый прогресс, если файл есть"""
+        with self.lock:
+            try:
+                with open(self.path, encoding='utf-8') as state_file:
+                    state = json.load(state_file)
+            except FileNotFoundError:
+                state = {}
+            self.tables = state.get('tables', {})
+            self.high_water_marks = state.get('high_water_marks', {})
+
+    def reset(self) -> None:
+        """Забывает прогресс по таблицам, перенос начнётся с начала"""
+        self.load()
+        with self.lock:
+            self.tables = {}
+            self.dump()
+
+    def last_rowid(self, table_name: str) -> int:
+        with self.lock:
+            return self.tables.get(table_name, {}).get('last_rowid', 0)
+
+    def is_done(self, table_name: str) -> bool:
+        with self.lock:
+            return self.tables.get(table_name, {}).get('done', False)
+
+    def save_checkpoint(self, table_name: str, last_rowid: int) -> None:
+        with self.lock:
+            self.tables.setdefault(table_name, {})['last_rowid'] = last_rowid
+            self.dump()
+
+    def mark_done(self, table_name: str) -> None:
+        with self.lock:
+            self.tables.setdefault(table_name, {})['done'] = True
+            self.dump()
+
+    def high_water_mark(self, table_name: str) -> str:
+        with self.lock:
+            return self.high_water_marks.get(table_name)
+
+    def save_high_water_mark(self, table_name: str, value: str) -> None:
+        with self.lock:
+            self.high_water_marks[table_name] = value
+            self.dump()
+
+    def dump(self) -> None:
+        """Пишет состояние во временный файл и подменяет им основной, вызывается под self.lock.
+        С path=None состояние живёт только в памяти"""
+        if self.path is None:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as state_file:
+            json.dump({'tables': self.tables, 'high_water_marks': self.high_water_marks}, state_file, indent=2)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,3 +1,4 @@
+from consistency import ConsistencyChecker
 from psql_manager import PostgreMenedger
 from sqlite_manager import SqliteMenedger
 
@@ -6,16 +7,10 @@ postgre = PostgreMenedger('content')
 
 
 def test_check_consistency():
+    checker = ConsistencyChecker(sqlite, postgre)
     for table_name in postgre.sql_command.keys():
-        while True:
-            sqlite_data = sqlite.fetch_data(table_name)
-            psql_data = postgre.fetch_data(table_name)
-            assert sqlite_data == psql_data
-
-            if not sqlite_data:
-                break
-
-        sqlite.offset = 0
+        report = checker.check_table(table_name)
+        assert report.ok, report
 
 
 def test_check_rows_count():
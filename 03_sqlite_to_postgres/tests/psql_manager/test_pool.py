@@ -0,0 +1,62 @@
+import psycopg2
+import psycopg2.extensions
+
+from psql_manager import PostgreMenedger
+
+
+class FakeInfo:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """Соединение без сервера: пулу нужны только closed, info, rollback и close"""
+
+    def __init__(self):
+        self.closed = 0
+        self.info = FakeInfo()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_pool_reuses_connections(monkeypatch):
+    connects = []
+
+    def connect(*args, **kwargs):
+        connects.append(FakeConnection())
+        return connects[-1]
+
+    monkeypatch.setattr(psycopg2, 'connect', connect)
+
+    with PostgreMenedger('content', pool_size=3) as postgre:
+        for _ in range(20):
+            with postgre.connection():
+                pass
+
+    assert len(connects) == 3
+    assert all(conn.closed for conn in connects)
+
+
+def test_pool_replaces_broken_connection(monkeypatch):
+    connects = []
+
+    def connect(*args, **kwargs):
+        connects.append(FakeConnection())
+        return connects[-1]
+
+    monkeypatch.setattr(psycopg2, 'connect', connect)
+
+    with PostgreMenedger('content', pool_size=1) as postgre:
+        try:
+            with postgre.connection():
+                raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        except psycopg2.OperationalError:
+            pass
+        for _ in range(5):
+            with postgre.connection() as conn:
+                assert not conn.closed
+
+    assert len(connects) == 2